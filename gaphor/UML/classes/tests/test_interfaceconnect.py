@@ -100,3 +100,19 @@ def test_dependency_unfolded_interface_connection(element_factory, diagram):
     style = diagram.style(StyledItem(dep))
 
     assert (7.0, 5.0) == style["dash-style"]
+
+
+def test_dependency_update_style_follows_folded_interface_connection(
+    element_factory, diagram
+):
+    element_factory.create(StyleSheet)
+    iface = diagram.create(InterfaceItem, subject=element_factory.create(UML.Interface))
+    iface.folded = Folded.PROVIDED
+    dep = diagram.create(DependencyItem)
+    diagram.update_now((iface, dep))
+    assert diagram.item_style(dep)["dash-style"]
+
+    connect(dep, dep.head, iface)
+    diagram.update_now((iface, dep))
+
+    assert not diagram.item_style(dep)["dash-style"]
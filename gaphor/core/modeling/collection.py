@@ -1,12 +1,15 @@
 """1:n and n:m relations in the data model are saved using a collection."""
 
-from typing import Generic, List, Type, TypeVar, overload
+from typing import Dict, Generic, Iterable, List, Type, TypeVar, overload
 
 from gaphor.core.modeling.event import AssociationUpdated
 from gaphor.core.modeling.listmixins import querymixin, recursemixin, recurseproxy
 
 T = TypeVar("T")
 
+# Marks the position of a removed item in an orderedset
+_gap = object()
+
 
 class collectionlist(recursemixin, querymixin, List[T]):  # type: ignore[misc]
     """
@@ -46,6 +49,142 @@ class collectionlist(recursemixin, querymixin, List[T]):  # type: ignore[misc]
     """
 
 
+class orderedset(Generic[T]):
+    """An insertion ordered set, that behaves like a list.
+
+    Membership tests, appending and removing items take constant time.
+    Items can be accessed by index, sliced and queried like a
+    ``collectionlist``.
+
+    Items are kept in a list, with a dict mapping each item to its
+    position in that list. Removing an item leaves a gap in the list,
+    unless it is the last item. Gaps are compacted when the set is
+    indexed or iterated, or when there are more gaps than items.
+
+    Iteration works on a snapshot: changing the set while it is being
+    iterated does not affect the items returned by the iterator. The
+    snapshot is shared with the set until the set is changed, so
+    iteration itself does not copy the items.
+
+    >>> s = orderedset(["a", "b", "c"])
+    >>> s.remove("b")
+    >>> s.append("d")
+    >>> s
+    ['a', 'c', 'd']
+    >>> "b" in s
+    False
+    >>> s[1]
+    'c'
+    """
+
+    def __init__(self, iterable: Iterable[T] = ()):
+        self._reset(iterable)
+
+    def _reset(self, iterable: Iterable[T]) -> None:
+        items = list(dict.fromkeys(iterable))
+        self._list: List[object] = items  # type: ignore[assignment]
+        self._index: Dict[T, int] = {v: n for n, v in enumerate(items)}
+        self._gaps = 0
+        self._shared = False
+
+    def _writable(self) -> List[object]:
+        if self._shared:
+            self._list = list(self._list)
+            self._shared = False
+        return self._list
+
+    def _compacted(self) -> List[T]:
+        if self._gaps:
+            # The dict is ordered the same way as the list, minus the gaps
+            self._reset(self._index)
+        return self._list  # type: ignore[return-value]
+
+    def _discard(self, n: int) -> None:
+        items = self._writable()
+        if n == len(items) - 1:
+            items.pop()
+            while items and items[-1] is _gap:
+                items.pop()
+                self._gaps -= 1
+        else:
+            items[n] = _gap
+            self._gaps += 1
+            if self._gaps > len(self._index):
+                self._compacted()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, obj) -> bool:
+        return obj in self._index
+
+    def __iter__(self):
+        items = self._compacted()
+        self._shared = True
+        return iter(items)
+
+    def __reversed__(self):
+        items = self._compacted()
+        self._shared = True
+        return reversed(items)
+
+    def __getitem__(self, key):
+        if key == slice(None, None, None):
+            return recurseproxy(collectionlist(self))
+        try:
+            return self._compacted()[key]
+        except TypeError:
+            # A query, see ``querymixin``
+            return collectionlist(self)[key]
+
+    def __setitem__(self, key, value) -> None:
+        items = list(self._compacted())
+        items[key] = value
+        self._reset(items)
+
+    def __eq__(self, other):
+        if isinstance(other, orderedset):
+            other = other._compacted()
+        return self._compacted() == other
+
+    def __str__(self):
+        return str(self._compacted())
+
+    __repr__ = __str__
+
+    def append(self, value: T) -> None:
+        if value in self._index:
+            return
+        items = self._writable()
+        self._index[value] = len(items)
+        items.append(value)
+
+    def remove(self, value: T) -> None:
+        try:
+            n = self._index.pop(value)
+        except KeyError:
+            raise ValueError(f"{value} is not in set") from None
+        self._discard(n)
+
+    def pop(self) -> T:
+        value, n = self._index.popitem()
+        self._discard(n)
+        return value
+
+    def index(self, value: T) -> int:
+        self._compacted()
+        try:
+            return self._index[value]
+        except KeyError:
+            raise ValueError(f"{value} is not in set") from None
+
+    def count(self, value: T) -> int:
+        return 1 if value in self._index else 0
+
+    def sort(self, key=None, reverse=False) -> None:
+        self._reset(sorted(self._index, key=key, reverse=reverse))
+
+
 class collection(Generic[T]):
     """Collection (set-like) for model elements' 1:n and n:m relationships."""
 
@@ -53,7 +192,7 @@ class collection(Generic[T]):
         self.property = property
         self.object = object
         self.type = type
-        self.items: collectionlist[T] = collectionlist()
+        self.items: orderedset[T] = orderedset()
 
     def __len__(self) -> int:
         return len(self.items)
@@ -87,7 +226,7 @@ class collection(Generic[T]):
     __repr__ = __str__
 
     def __bool__(self):
-        return self.items != []
+        return len(self.items) > 0
 
     def append(self, value: T) -> None:
         if isinstance(value, self.type):
@@ -151,9 +290,11 @@ class collection(Generic[T]):
         Return true if swap was successful.
         """
         try:
-            i1 = self.items.index(item1)
-            i2 = self.items.index(item2)
-            self.items[i1], self.items[i2] = self.items[i2], self.items[i1]
+            items = list(self.items)
+            i1 = items.index(item1)
+            i2 = items.index(item2)
+            items[i1], items[i2] = items[i2], items[i1]
+            self.items[:] = items
 
             self.object.handle(AssociationUpdated(self.object, self.property))
             return True
@@ -4,6 +4,7 @@ Diagrams can be visualized and edited.
 """
 from __future__ import annotations
 
+import itertools
 import logging
 import uuid
 from dataclasses import dataclass
@@ -14,6 +15,7 @@ from typing import (
     Iterator,
     Protocol,
     Sequence,
+    Tuple,
     TypeVar,
     overload,
     runtime_checkable,
@@ -30,12 +32,15 @@ from gaphor.core.modeling.properties import (
     attribute,
     relation_many,
     relation_one,
+    umlproperty,
 )
 from gaphor.core.modeling.stylesheet import StyleSheet
-from gaphor.core.styling import Style, StyleNode
+from gaphor.core.styling import CompiledStyleSheet, Style, StyleNode
 
 log = logging.getLogger(__name__)
 
+_update_generation = itertools.count(1)
+
 # Not all styles are requires: "background-color", "font-weight",
 # "text-color", and "text-decoration" are optional (can default to None)
 FALLBACK_STYLE: Style = {
@@ -58,6 +63,20 @@ class UpdateContext:
     style: Style
 
 
+@dataclass
+class UpdateRequestStatistics:
+    """Counters for update requests that were collected in a batch.
+
+    ``requests`` is the number of items requested, ``merged`` the
+    number of those that were already pending, and ``flushes`` the
+    number of batches sent to the views.
+    """
+
+    requests: int = 0
+    merged: int = 0
+    flushes: int = 0
+
+
 @dataclass(frozen=True)
 class DrawContext:
     """Special context for draw()'ing the item.
@@ -109,6 +128,63 @@ def rgetattr(obj, names):
         yield v
 
 
+Dependencies = Tuple[Tuple[Element, int], ...]
+
+
+def style_dependencies(
+    compiled: CompiledStyleSheet, item: Presentation
+) -> Dependencies | None:
+    """The elements the style of an item is matched on, with their
+    revision.
+
+    Returns ``None`` if the style depends on something that does not send
+    events: an attribute that is not a umlproperty, or (for ``:has()``
+    and ``:empty``) the children of the item.
+    """
+    if compiled.descendants:
+        return None
+
+    fields = [attr.split(".") for attr in compiled.attributes]
+    elements: dict[Element, None] = {}
+
+    def add(element: Element) -> bool:
+        elements[element] = None
+        return all(_add_path_elements(element, names, elements) for names in fields)
+
+    nodes = (
+        [item, *gaphas.canvas.ancestors(item.diagram, item)]
+        if compiled.ancestors
+        else [item]
+    )
+    for node in nodes:
+        if not add(node) or (node.subject and not add(node.subject)):
+            return None
+    if compiled.ancestors and not add(item.diagram):
+        return None
+
+    return tuple((e, e.revision) for e in elements)
+
+
+def _add_path_elements(obj, names, elements) -> bool:
+    """Add the elements on an attribute path to ``elements``, like
+    ``rgetattr()`` visits them.
+
+    Returns ``False`` if a value on the path does not send events.
+    """
+    if not isinstance(obj, Element):
+        return False
+    elements[obj] = None
+    name, *tail = names
+    name = attrname(obj, name)
+    if not isinstance(getattr(type(obj), name, None), umlproperty):
+        return not hasattr(obj, name)
+    if not tail:
+        return True
+    v = getattr(obj, name)
+    values = v if isinstance(v, (collection, list, tuple)) else (v,)
+    return all(_add_path_elements(m, tail, elements) for m in values if m is not None)
+
+
 def attrstr(obj):
     """Returns lower-case string representation of an attribute."""
     if isinstance(obj, str):
@@ -224,6 +300,21 @@ class Diagram(Element):
         self._connections.add_handler(self._on_constraint_solved)
 
         self._registered_views: set[gaphas.view.model.View] = set()
+        self._awake = False
+
+        # Dirty and removed items, collected during a transaction
+        self._update_batch: tuple[
+            dict[Presentation, None], dict[Presentation, None]
+        ] | None = None
+        self.update_request_statistics = UpdateRequestStatistics()
+
+        # Changes whenever an item is (requested to be) updated
+        self._update_generations: dict[Presentation, int] = {}
+
+        # Base styles per item, with the revisions of the elements they
+        # were matched on. Valid for one compiled style sheet.
+        self._item_styles: dict[Presentation, tuple[Style, Dependencies]] = {}
+        self._item_styles_compiled: CompiledStyleSheet | None = None
 
         self._watcher = self.watcher()
         self._watcher.watch("ownedPresentation", self._presentation_removed)
@@ -234,16 +325,47 @@ class Diagram(Element):
 
     def _presentation_removed(self, event):
         if isinstance(event, AssociationDeleted) and event.old_value:
+            self._update_generations.pop(event.old_value, None)
+            self._item_styles.pop(event.old_value, None)
             self._update_views(removed_items=(event.old_value,))
 
     @property
     def styleSheet(self) -> StyleSheet | None:
-        return next(self.model.select(StyleSheet), None)
+        return self.model.lookup_singleton(StyleSheet)
 
     def style(self, node: StyleNode) -> Style:
         style_sheet = self.styleSheet
         return style_sheet.match(node) if style_sheet else FALLBACK_STYLE
 
+    def item_style(self, item: Presentation) -> Style:
+        """The base style of an item, as used for updates.
+
+        The style is kept until one of the elements it was matched on
+        sends an event, or the style sheet changes. If the style sheet
+        queries attributes of the item that do not send events, such as
+        computed properties, the style is matched on every update.
+        """
+        style_sheet = self.styleSheet
+        if not style_sheet:
+            return FALLBACK_STYLE
+
+        compiled = style_sheet.compiled_style_sheet
+        if compiled is not self._item_styles_compiled:
+            self._item_styles.clear()
+            self._item_styles_compiled = compiled
+
+        cached = self._item_styles.get(item)
+        if cached and all(e.revision == r for e, r in cached[1]):
+            return cached[0]
+
+        style = compiled.match(StyledItem(item))
+        dependencies = style_dependencies(compiled, item)
+        if dependencies is None:
+            self._item_styles.pop(item, None)
+        else:
+            self._item_styles[item] = (style, dependencies)
+        return style
+
     def save(self, save_func):
         """Apply the supplied save function to this diagram and the canvas."""
 
@@ -277,9 +399,18 @@ class Diagram(Element):
         return item
 
     def lookup(self, id):
+        """Find a presentation item on this diagram.
+
+        Presentation items are looked up in the model. Only items that
+        are not registered in the model are searched for on the diagram.
+        """
+        item = self.model.lookup(id)
+        if isinstance(item, Presentation) and item.diagram is self:
+            return item
         for item in self.get_all_items():
             if item.id == id:
                 return item
+        return None
 
     def unlink(self):
         """Unlink all canvas items then unlink this diagram."""
@@ -341,10 +472,72 @@ class Diagram(Element):
     def request_update(self, item: gaphas.item.Item) -> None:
         self._update_views(dirty_items=(item,))
 
+    def update_generation(self, item: Presentation) -> int:
+        """A number that changes every time an item is updated.
+
+        Painters can use it to tell if an item still looks the same.
+        """
+        return self._update_generations.get(item, 0)
+
+    def _bump_update_generations(self, items):
+        generations = self._update_generations
+        for item in items:
+            generations[item] = next(_update_generation)
+
     def _update_views(self, dirty_items=(), removed_items=()):
-        """Send an update notification to all registered views."""
-        for v in self._registered_views:
-            v.request_update(dirty_items, removed_items)
+        """Send an update notification to all registered views.
+
+        While an update batch is open, the items are collected and sent
+        when the batch is flushed.
+        """
+        self._bump_update_generations(dirty_items)
+        if not self._registered_views:
+            return
+
+        batch = self._update_batch
+        if batch is None:
+            for v in self._registered_views:
+                v.request_update(dirty_items, removed_items)
+            return
+
+        statistics = self.update_request_statistics
+        for items, pending in zip((dirty_items, removed_items), batch):
+            for item in items:
+                statistics.requests += 1
+                if item in pending:
+                    statistics.merged += 1
+                else:
+                    pending[item] = None
+
+    def begin_update_batch(self) -> bool:
+        """Collect update requests, until ``flush_update_batch()`` is
+        called.
+
+        Returns ``False`` if a batch is already open, or if the diagram
+        has no views to send requests to. See
+        ``ElementFactory.update_batch()``.
+        """
+        if self._update_batch is not None or not self._registered_views:
+            return False
+        self._update_batch = ({}, {})
+        return True
+
+    def flush_update_batch(self) -> None:
+        """Send the collected update requests to the views, one request per
+        view."""
+        batch = self._update_batch
+        if batch is None:
+            return
+        self._update_batch = None
+
+        dirty, removed = batch
+        if removed:
+            dirty_items = [item for item in dirty if item not in removed]
+        else:
+            dirty_items = list(dirty)
+        if dirty_items or removed:
+            self.update_request_statistics.flushes += 1
+            self._update_views(dirty_items, list(removed))
 
     @gaphas.decorators.nonrecursive
     def update_now(
@@ -353,6 +546,7 @@ class Diagram(Element):
         dirty_matrix_items: Sequence[Presentation] = (),
     ) -> None:
         """Update the diagram canvas."""
+        self._wake_up()
         sort = self.sort
 
         def dirty_items_with_ancestors():
@@ -366,10 +560,11 @@ class Diagram(Element):
         self._connections.solve()
 
     def _update_items(self, items):
+        self._bump_update_generations(items)
         for item in items:
             update = getattr(item, "update", None)
             if update:
-                update(UpdateContext(style=self.style(StyledItem(item))))
+                update(UpdateContext(style=self.item_style(item)))
 
     def _on_constraint_solved(self, cinfo: gaphas.connections.Connection) -> None:
         dirty_items = set()
@@ -380,11 +575,39 @@ class Diagram(Element):
         if dirty_items:
             self._update_views(dirty_items)
 
+    @property
+    def awake(self) -> bool:
+        """Presentation items watch the model only while the diagram is
+        awake.
+
+        A diagram wakes up when a view is registered, or when it's
+        updated (e.g. by an exporter). It falls asleep again when the
+        last view is unregistered.
+        """
+        return self._awake
+
+    def _wake_up(self) -> None:
+        if self._awake:
+            return
+        self._awake = True
+        for item in self.ownedPresentation:
+            item.subscribe_deferred_watches()
+
+    def _fall_asleep(self) -> None:
+        if not self._awake:
+            return
+        self._awake = False
+        for item in self.ownedPresentation:
+            item.unsubscribe_deferred_watches()
+
     def register_view(self, view: gaphas.view.model.View[Presentation]) -> None:
         self._registered_views.add(view)
+        self._wake_up()
 
     def unregister_view(self, view: gaphas.view.model.View[Presentation]) -> None:
         self._registered_views.discard(view)
+        if not self._registered_views:
+            self._fall_asleep()
 
 
 Presentation.diagram = association(
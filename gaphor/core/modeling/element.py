@@ -11,6 +11,7 @@ from typing import TYPE_CHECKING, Callable, Iterator, Protocol, TypeVar, overloa
 from gaphor.core.modeling.event import ElementUpdated
 from gaphor.core.modeling.properties import (
     attribute,
+    property_table,
     relation_many,
     relation_one,
     umlproperty,
@@ -64,12 +65,18 @@ class Element:
         # The model this element belongs to.
         self._model = model
         self._unlink_lock = 0
+        self._revision = 0
 
     @property
     def id(self) -> Id:
         "Id"
         return self._id
 
+    @property
+    def revision(self) -> int:
+        """A number that changes whenever the element sends an event."""
+        return self._revision
+
     @property
     def model(self) -> RepositoryProtocol:
         """The owning model, raises AssertionError when model is not set."""
@@ -81,16 +88,11 @@ class Element:
     @classmethod
     def umlproperties(class_) -> Iterator[umlproperty]:
         """Iterate over all properties."""
-        umlprop = umlproperty
-        for propname in dir(class_):
-            if not propname.startswith("_"):
-                prop = getattr(class_, propname)
-                if isinstance(prop, umlprop):
-                    yield prop
+        return iter(property_table(class_).all)
 
     def save(self, save_func):
         """Save the state by calling save_func(name, value)."""
-        for prop in self.umlproperties():
+        for prop in property_table(type(self)).saveable:
             prop.save(self, save_func)
 
     def load(self, name, value):
@@ -108,7 +110,7 @@ class Element:
 
     def postload(self):
         """Fix up the odds and ends."""
-        for prop in self.umlproperties():
+        for prop in property_table(type(self)).derived:
             prop.postload(self)
 
     def unlink(self):
@@ -126,7 +128,7 @@ class Element:
         try:
             self._unlink_lock += 1
 
-            for prop in self.umlproperties():
+            for prop in property_table(type(self)).unlinkable:
                 prop.unlink(self)
 
             log.debug("unlinking %s", self)
@@ -137,6 +139,7 @@ class Element:
 
     def handle(self, event):
         """Propagate incoming events."""
+        self._revision += 1
         model = self._model
         if model:
             model.handle(event)
@@ -192,6 +195,9 @@ class RepositoryProtocol(Protocol):
     def lookup(self, id: str) -> Element | None:
         ...
 
+    def lookup_singleton(self, type: type[T]) -> T | None:
+        ...
+
     def watcher(
         self, element: Element, default_handler: Handler | None = None
     ) -> EventWatcherProtocol:
@@ -204,6 +210,10 @@ class RepositoryProtocol(Protocol):
     def block_events(self) -> Iterator[RepositoryProtocol]:
         ...
 
+    @contextmanager
+    def update_batch(self) -> Iterator[RepositoryProtocol]:
+        ...
+
 
 class EventWatcherProtocol(Protocol):
     def watch(self, path: str, handler: Handler | None = None) -> EventWatcherProtocol:
@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import logging
+from typing import Iterator
 
 from gaphor.abc import Service
 from gaphor.core import event_handler
@@ -12,7 +13,6 @@ from gaphor.core.modeling.event import (
     AssociationDeleted,
     AssociationSet,
     ElementUpdated,
-    ModelReady,
 )
 from gaphor.core.modeling.properties import umlproperty
 
@@ -69,6 +69,32 @@ class EventWatcher:
             dispatcher.unsubscribe(handler)
 
 
+class PathNode:
+    """A compiled watch path: a property and the remaining path.
+
+    Nodes are shared: paths with the same remainder refer to the same
+    node, so a remainder can be compared by identity and is stored only
+    once, no matter how many handlers are registered for it.
+    """
+
+    __slots__ = ("property", "remainder", "__weakref__")
+
+    def __init__(self, property: umlproperty, remainder: PathNode | None):
+        self.property = property
+        self.remainder = remainder
+
+    def __repr__(self):
+        path = []
+        node: PathNode | None = self
+        while node:
+            path.append(node.property.name)
+            node = node.remainder
+        return f"<PathNode {'.'.join(path)}>"
+
+
+NO_REMAINDERS: frozenset[PathNode] = frozenset()
+
+
 class ElementDispatcher(Service):
     """The Element based Dispatcher allows handlers to receive only events
     related to certain elements. Those elements should be registered too. A
@@ -93,6 +119,10 @@ class ElementDispatcher(Service):
     This dispatcher keeps track of the kind of events that are dispatched. The
     dispatcher table is updated accordingly (so the right handlers are fired
     every time).
+
+    While a model is loaded, events are blocked, so the dispatcher table
+    can not follow new associations. Once the model is complete, the
+    element factory calls ``rebuild_generator()`` to catch up.
     """
 
     def __init__(self, event_manager, modeling_language):
@@ -100,23 +130,35 @@ class ElementDispatcher(Service):
         self.modeling_language = modeling_language
 
         # Table used to fire events:
-        # (event.element, event.property): { handler: set(path, ..), ..}
-        self._handlers: dict[tuple[Element, umlproperty], dict[Handler, set]] = dict()
+        # (event.element, event.property): { handler: frozenset(path, ..), ..}
+        self._handlers: dict[
+            tuple[Element, umlproperty], dict[Handler, frozenset[PathNode]]
+        ] = dict()
 
         # Fast resolution when handlers are disconnected
-        # handler: [(element, property), ..]
-        self._reverse: dict[Handler, list[tuple[Element, umlproperty]]] = dict()
+        # handler: {(element, property): None, ..}
+        self._reverse: dict[Handler, dict[tuple[Element, umlproperty], None]] = dict()
+
+        # Compiled paths, shared by all subscriptions:
+        # (class, path): PathNode
+        self._paths: dict[tuple[type, str], PathNode] = dict()
+        # (property, remainder): PathNode
+        self._nodes: dict[tuple[umlproperty, PathNode | None], PathNode] = dict()
 
-        self.event_manager.subscribe(self.on_model_loaded)
         self.event_manager.subscribe(self.on_element_change_event)
 
     def shutdown(self) -> None:
         self.event_manager.unsubscribe(self.on_element_change_event)
-        self.event_manager.unsubscribe(self.on_model_loaded)
 
     def subscribe(self, handler: Handler, element: Element, path: str) -> None:
-        props = self._path_to_properties(element, path)
-        self._add_handlers(element, props, handler)
+        key = (type(element), path)
+        try:
+            node = self._paths[key]
+        except KeyError:
+            node = self._paths[key] = self._compile(
+                self._path_to_properties(element, path)
+            )
+        self._add_handlers(element, node, handler)
 
     def unsubscribe(self, handler: Handler) -> None:
         """Unregister a handler from the registry."""
@@ -161,35 +203,27 @@ class ElementDispatcher(Service):
                 c = prop.type
         return tuple(tpath)
 
-    def _add_handlers(self, element, props, handler):
-        """Provided an element and a path of properties (props), register the
-        handler for each property."""
-        property, remainder = props[0], props[1:]
-        key = (element, property)
-
-        # Register key
-        try:
-            handlers = self._handlers[key]
-        except KeyError:
-            handlers = {}
-            self._handlers[key] = handlers
-
-        # Register handler and it's remaining paths
-        try:
-            remainders = handlers[handler]
-        except KeyError:
-            remainders = handlers[handler] = set()
-        if remainder:
-            remainders.add(remainder)
-
-        # Also add them to the reverse table, easing disconnecting
+    def _node(self, property: umlproperty, remainder: PathNode | None) -> PathNode:
+        key = (property, remainder)
         try:
-            reverse = self._reverse[handler]
+            return self._nodes[key]
         except KeyError:
-            reverse = []
-            self._reverse[handler] = reverse
-
-        reverse.append(key)
+            node = self._nodes[key] = PathNode(property, remainder)
+            return node
+
+    def _compile(self, props: tuple[umlproperty, ...]) -> PathNode:
+        """Turn a tuple of properties into a chain of shared path nodes."""
+        node = None
+        for prop in reversed(props):
+            node = self._node(prop, node)
+        assert node
+        return node
+
+    def _add_handlers(self, element, node, handler):
+        """Provided an element and a path node, register the handler for each
+        property in the path."""
+        property, remainder = node.property, node.remainder
+        self._register_handler((element, property), remainder, handler)
 
         # Apply remaining path
         if remainder:
@@ -201,6 +235,28 @@ class ElementDispatcher(Service):
                 if e and remainder:
                     self._add_handlers(e, remainder, handler)
 
+    def _register_handler(self, key, remainder, handler):
+        # Register key. Keys are often new, e.g. when a model is loaded,
+        # so avoid the cost of raising KeyError.
+        handlers = self._handlers.get(key)
+        if handlers is None:
+            handlers = self._handlers[key] = {}
+
+        # Register handler and it's remaining paths.
+        # Remainder sets are immutable, so the empty set can be shared.
+        remainders = handlers.get(handler, NO_REMAINDERS)
+        if remainder and remainder not in remainders:
+            handlers[handler] = remainders | {remainder}
+        elif handler not in handlers:
+            handlers[handler] = remainders
+
+        # Also add them to the reverse table, easing disconnecting
+        reverse = self._reverse.get(handler)
+        if reverse is None:
+            reverse = self._reverse[handler] = {}
+
+        reverse[key] = None
+
     def _remove_handlers(self, element, property, handler):
         """Remove the handler of the path of elements."""
         key = element, property
@@ -211,12 +267,12 @@ class ElementDispatcher(Service):
         if property.upper == "*" or property.upper > 1:
             for remainder in handlers.get(handler, ()):
                 for e in property._get(element):
-                    self._remove_handlers(e, remainder[0], handler)
+                    self._remove_handlers(e, remainder.property, handler)
         else:
             for remainder in handlers.get(handler, ()):
                 e = property._get(element)
                 if e:
-                    self._remove_handlers(e, remainder[0], handler)
+                    self._remove_handlers(e, remainder.property, handler)
         try:
             del handlers[handler]
         except KeyError:
@@ -248,7 +304,7 @@ class ElementDispatcher(Service):
                     for handler, remainders in handlers.items():
                         for remainder in remainders:
                             self._remove_handlers(
-                                event.old_value, remainder[0], handler
+                                event.old_value, remainder.property, handler
                             )
 
                 if (
@@ -259,9 +315,65 @@ class ElementDispatcher(Service):
                         for remainder in remainders:
                             self._add_handlers(event.new_value, remainder, handler)
 
-    @event_handler(ModelReady)
-    def on_model_loaded(self, event):
-        for key, value in list(self._handlers.items()):
-            for h, remainders in list(value.items()):
-                for remainder in remainders:
-                    self._add_handlers(key[0], (key[1],) + remainder, h)
+    def rebuild_generator(self) -> Iterator[float]:
+        """Apply the remaining paths of all handlers to the model.
+
+        This is needed after a model has been loaded with events blocked.
+        Handlers are grouped per element and property, so each
+        association is traversed once for all paths and handlers that go
+        through it.
+
+        This function is a generator. It will yield values from 0 to 100
+        (%) to indicate its progression.
+        """
+        entries = [
+            (element, property, list(handlers.items()))
+            for (element, property), handlers in self._handlers.items()
+            if any(handlers.values())
+        ]
+        size = len(entries)
+        for n, (element, property, handler_remainders) in enumerate(entries, start=1):
+            self._add_remainders(element, property, handler_remainders)
+            if n % 100 == 0:
+                yield (n * 100) / size
+        yield 100
+
+    def _add_remainders(self, element, property, handler_remainders):
+        """Register handlers for their remaining paths, on the elements
+        referred to by ``element.property``.
+
+        ``handler_remainders`` is a sequence of ``(handler, remainders)``.
+        """
+        if property.upper == "*" or property.upper > 1:
+            targets = property._get(element)
+        else:
+            target = property._get(element)
+            targets = (target,) if target else ()
+        if not targets:
+            return
+
+        # Group by the next property in the path, so the registrations
+        # and nested remainders can be reused for every target element.
+        by_property: dict[umlproperty, list[tuple[Handler, PathNode | None]]] = {}
+        for handler, remainders in handler_remainders:
+            for remainder in remainders:
+                by_property.setdefault(remainder.property, []).append(
+                    (handler, remainder.remainder)
+                )
+        steps = [
+            (
+                next_property,
+                pairs,
+                [(handler, (remainder,)) for handler, remainder in pairs if remainder],
+            )
+            for next_property, pairs in by_property.items()
+        ]
+
+        register = self._register_handler
+        for target in targets:
+            for next_property, pairs, nested in steps:
+                key = (target, next_property)
+                for handler, remainder in pairs:
+                    register(key, remainder, handler)
+                if nested:
+                    self._add_remainders(target, next_property, nested)
@@ -5,6 +5,7 @@ from __future__ import annotations
 import uuid
 from collections import OrderedDict
 from contextlib import contextmanager
+from functools import lru_cache
 from typing import TYPE_CHECKING, Callable, Iterator, TypeVar, overload
 
 from gaphor.abc import Service
@@ -32,6 +33,13 @@ T = TypeVar("T", bound=Element)
 P = TypeVar("P", bound=Presentation)
 
 
+@lru_cache()
+def _indexed_types(type: type[Element]) -> tuple[type[Element], ...]:
+    """The classes an element of ``type`` is registered under in the type
+    index: every model class in its MRO."""
+    return tuple(c for c in type.__mro__ if issubclass(c, Element))
+
+
 class ElementFactory(Service):
     """The ElementFactory is used to create elements and do lookups to
     elements.
@@ -52,6 +60,8 @@ class ElementFactory(Service):
         self.event_manager = event_manager
         self.element_dispatcher = element_dispatcher
         self._elements: dict[str, Element] = OrderedDict()
+        self._elements_by_type: dict[type[Element], dict[str, Element]] = {}
+        self._singletons: dict[type[Element], Element | None] = {}
         self._block_events = 0
 
     def shutdown(self) -> None:
@@ -76,19 +86,52 @@ class ElementFactory(Service):
             # Avoid events that reference this element before its created-event is emitted.
             with self.block_events():
                 item = type(diagram=diagram, id=id)
-            self._elements[id] = item
+            self._add(item)
             self.handle(ElementCreated(self, item, diagram))
             return item
         elif issubclass(type, Element):
             if diagram:
                 raise TypeError("Element types require no diagram")
             obj = type(id, self)
-            self._elements[id] = obj
+            self._add(obj)
             self.handle(ElementCreated(self, obj))
             return obj
         else:
             raise TypeError(f"Type {type} is not a valid model element")
 
+    def _add(self, element: Element) -> None:
+        id = element.id
+        if id in self._elements:
+            self._remove(self._elements[id])
+        self._elements[id] = element
+        index = self._elements_by_type
+        singletons = self._singletons
+        for t in _indexed_types(type(element)):
+            singletons.pop(t, None)
+            try:
+                index[t][id] = element
+            except KeyError:
+                index[t] = {id: element}
+
+    def _remove(self, element: Element) -> bool:
+        """Remove an element from the factory.
+
+        Returns ``False`` if the element was not known.
+        """
+        id = element.id
+        if self._elements.get(id) is not element:
+            return False
+        del self._elements[id]
+        index = self._elements_by_type
+        singletons = self._singletons
+        for t in _indexed_types(type(element)):
+            singletons.pop(t, None)
+            elements = index[t]
+            del elements[id]
+            if not elements:
+                del index[t]
+        return True
+
     def size(self) -> int:
         """Return the amount of elements currently in the factory."""
         return len(self._elements)
@@ -99,6 +142,19 @@ class ElementFactory(Service):
 
     __getitem__ = lookup
 
+    def lookup_singleton(self, type: type[T]) -> T | None:
+        """Find the (first) element of type ``type``.
+
+        This is meant for elements that occur only once in a model, such
+        as the style sheet. The result is kept until an element of that
+        type is created or removed.
+        """
+        try:
+            return self._singletons[type]  # type: ignore[return-value]
+        except KeyError:
+            element = self._singletons[type] = next(self.select(type), None)
+            return element
+
     def __contains__(self, element: Element) -> bool:
         assert isinstance(element.id, str)
         return self.lookup(element.id) is element
@@ -120,7 +176,12 @@ class ElementFactory(Service):
         if expression is None:
             yield from self._elements.values()
         elif isinstance(expression, type):
-            yield from (e for e in self._elements.values() if isinstance(e, expression))
+            if issubclass(expression, Element):
+                yield from self._elements_by_type.get(expression, {}).values()
+            else:
+                yield from (
+                    e for e in self._elements.values() if isinstance(e, expression)
+                )
         else:
             yield from (e for e in self._elements.values() if expression(e))
 
@@ -173,8 +234,37 @@ class ElementFactory(Service):
     def model_ready(self) -> None:
         """Send notification that a new model has been loaded by means of the
         ModelReady event from gaphor.core.modeling.event."""
+        for _ in self.model_ready_generator():
+            pass
+
+    def model_ready_generator(self) -> Iterator[float]:
+        """Bring the element dispatcher up to date with the loaded model,
+        then send the ModelReady event.
+
+        This function is a generator. It will yield values from 0 to 100
+        (%) to indicate its progression.
+        """
+        if self.element_dispatcher:
+            yield from self.element_dispatcher.rebuild_generator()
+        else:
+            yield 100
         self.handle(ModelReady(self))
 
+    @contextmanager
+    def update_batch(self):
+        """Merge update requests for diagram items until the block ends.
+
+        Meant for bulk operations, like paste, undo and console commands,
+        that change many items at once. Interactive changes should not be
+        batched: views should redraw while the user drags an item.
+        """
+        diagrams = [d for d in self.select(Diagram) if d.begin_update_batch()]
+        try:
+            yield self
+        finally:
+            for diagram in diagrams:
+                diagram.flush_update_batch()
+
     @contextmanager
     def block_events(self):
         """Block events from being emitted."""
@@ -190,9 +280,7 @@ class ElementFactory(Service):
         if isinstance(event, UnlinkEvent):
             element = event.element
             assert isinstance(element.id, str)
-            try:
-                del self._elements[element.id]
-            except KeyError:
+            if not self._remove(element):
                 return
             event = ElementDeleted(self, event.element, event.diagram)
         if self.event_manager and not self._block_events:
@@ -8,7 +8,13 @@ from typing import TYPE_CHECKING, Generic, TypeVar
 
 from gaphas.item import Matrices
 
-from gaphor.core.modeling.element import Element, Id, UnlinkEvent
+from gaphor.core.modeling.element import (
+    Element,
+    EventWatcherProtocol,
+    Handler,
+    Id,
+    UnlinkEvent,
+)
 from gaphor.core.modeling.event import RevertibeEvent
 from gaphor.core.modeling.properties import association, relation_many, relation_one
 
@@ -30,6 +36,11 @@ class Presentation(Matrices, Element, Generic[S]):
     do not emit ElementCreated and ElementDeleted events. Presentations
     have their own create and delete events: ElementCreated and
     ElementDeleted.
+
+    Watches on the presentation's own properties are always active.
+    Watches that reach further into the model (e.g. "subject.name") are
+    only subscribed while the diagram is visible: either it's shown in a
+    view, or it has been rendered with ``Diagram.update_now()``.
     """
 
     def __init__(self, diagram: Diagram, id: Id | None = None) -> None:
@@ -40,7 +51,12 @@ class Presentation(Matrices, Element, Generic[S]):
             if self.diagram:
                 self.diagram.request_update(self)
 
+        self._update = update
         self._watcher = self.watcher(default_handler=update)
+        self._deferred_paths: dict[str, Handler | None] = {}
+        self._deferred_watcher: EventWatcherProtocol | None = None
+        if diagram.awake:
+            self._deferred_watcher = self.watcher(default_handler=update)
         self.watch("subject")
         self.watch("children")
         self.watch("diagram", self._on_diagram_changed)
@@ -67,11 +83,43 @@ class Presentation(Matrices, Element, Generic[S]):
         Watches should be set in the constructor, so they can be registered
         and unregistered in one shot.
 
+        Paths that go beyond the item itself are only subscribed while the
+        diagram is awake.
+
         This interface is fluent(returns self).
         """
-        self._watcher.watch(path, handler)
+        if "." in path:
+            self._deferred_paths[path] = handler
+            if self._deferred_watcher:
+                self._deferred_watcher.watch(path, handler)
+        else:
+            self._watcher.watch(path, handler)
         return self
 
+    def subscribe_deferred_watches(self) -> None:
+        """Subscribe watches on the model, when the diagram wakes up.
+
+        Changes may have been missed while the watches were not
+        subscribed, so all handlers are called once to bring the item up
+        to date.
+        """
+        if self._deferred_watcher:
+            return
+        watcher = self._deferred_watcher = self.watcher(default_handler=self._update)
+        for path, handler in self._deferred_paths.items():
+            watcher.watch(path, handler)
+        for handler in dict.fromkeys(
+            handler or self._update for handler in self._deferred_paths.values()
+        ):
+            handler(None)  # type: ignore[arg-type]
+
+    def unsubscribe_deferred_watches(self) -> None:
+        """Drop the watches on the model, when the diagram is no longer
+        visible."""
+        if self._deferred_watcher:
+            self._deferred_watcher.unsubscribe_all()
+            self._deferred_watcher = None
+
     def load(self, name, value):
         if name == "matrix":
             self.matrix.set(*ast.literal_eval(value))
@@ -90,6 +138,7 @@ class Presentation(Matrices, Element, Generic[S]):
 
     def inner_unlink(self, unlink_event: UnlinkEvent) -> None:
         self._watcher.unsubscribe_all()
+        self.unsubscribe_deferred_watches()
         self.matrix.remove_handler(self._on_matrix_changed)
 
         parent = self.parent
@@ -30,7 +30,9 @@ from typing import (
     Any,
     Callable,
     Generic,
+    Iterable,
     Literal,
+    NamedTuple,
     Protocol,
     Sequence,
     TypeVar,
@@ -128,6 +130,11 @@ class umlproperty:
         self._dependent_properties: set[derived | redefine] = set()
         self.name = name
         self._name = "_" + name
+        # Properties are assigned to a class right after they're created
+        invalidate_property_tables()
+
+    def __set_name__(self, owner, name):
+        invalidate_property_tables()
 
     def __get__(self, obj, class_=None):
         if obj:
@@ -442,6 +449,7 @@ class association(umlproperty):
                 # Do not let property start with underscore, or it will not be found
                 # as a umlproperty.
                 setattr(self.type, "GAPHOR__associationstub__%x" % id(self), self.stub)
+                invalidate_property_tables()
             self.stub._set(value, obj)
 
     def _del(self, obj, value, from_opposite=False, do_notify=True):
@@ -572,6 +580,29 @@ class unioncache:
         self.version = version
 
 
+class subsetset(set):
+    """The subsets of a derived property.
+
+    Subsets added later on, e.g. by a profile, notify the derived
+    property of changes as well.
+    """
+
+    def __init__(self, derived: derived, subsets: Iterable[relation]) -> None:
+        super().__init__()
+        self.derived = derived
+        for s in subsets:
+            self.add(s)
+
+    def add(self, s: relation) -> None:
+        assert isinstance(
+            s, (association, derived)
+        ), f"have element {s}, expected association"
+        super().add(s)
+        s._dependent_properties.add(self.derived)
+        if isinstance(self.derived, derivedunion):
+            self.derived._local = None
+
+
 class derived(umlproperty, Generic[T]):
     """Base class for derived properties, both derived unions and custom
     properties.
@@ -601,15 +632,9 @@ class derived(umlproperty, Generic[T]):
         self.lower = lower
         self.upper = upper
         self.filter = filter
-        self.subsets = set(subsets)
+        self.subsets = subsetset(self, subsets)
         self.single = len(subsets) == 1
 
-        for s in subsets:
-            assert isinstance(
-                s, (association, derived)
-            ), f"have element {s}, expected association"
-            s._dependent_properties.add(self)
-
     def load(self, obj, value):
         raise ValueError(
             "Derivedunion: Properties should not be loaded in a derived union %s: %s"
@@ -727,12 +752,30 @@ def object_has_property(obj, prop):
     return prop is found
 
 
+def is_local(prop: umlproperty) -> bool:
+    """The value of the property only depends on properties of the element
+    itself.
+
+    Derived properties, other than derived unions, apply a filter that may
+    navigate to other elements.
+    """
+    if isinstance(prop, redefine):
+        return is_local(prop.original)
+    if isinstance(prop, derivedunion):
+        return prop.local
+    return not isinstance(prop, derived)
+
+
 class derivedunion(derived[T]):
     """Derived union.
 
       Element.union = derivedunion('union', subset1, subset2..subsetn)
 
     The subsets are the properties that participate in the union (Element.name).
+
+    If all subsets are properties of the element itself, a change only
+    invalidates the union of the element that changed. Otherwise all
+    cached unions are invalidated.
     """
 
     def __init__(
@@ -744,6 +787,23 @@ class derivedunion(derived[T]):
         *subsets: relation,
     ):
         super().__init__(name, type, lower, upper, self._union, *subsets)
+        self._local: bool | None = None
+
+    @property
+    def local(self) -> bool:
+        """The union only depends on properties of the element itself."""
+        if self._local is None:
+            self._local = all(is_local(s) for s in self.subsets)
+        return self._local
+
+    def _invalidate(self, obj):
+        if self.local:
+            try:
+                delattr(obj, self._name)
+            except AttributeError:
+                pass
+        else:
+            self.version += 1
 
     def _union(self, obj, exclude=None):
         """Returns a union of all values as a set."""
@@ -776,7 +836,7 @@ class derivedunion(derived[T]):
         if event.property not in self.subsets:
             return
         # Make sure unions are created again
-        self.version += 1
+        self._invalidate(event.element)
 
         if not isinstance(event, AssociationUpdated):
             return
@@ -910,3 +970,73 @@ class redefine(umlproperty):
                     + str(event)
                     + " for redefined association"
                 )
+
+
+class PropertyTable(NamedTuple):
+    """The umlproperties of a model class, in alphabetical order.
+
+    Saveable properties are saved and loaded. Derived properties need
+    a postload. All but the derived properties are unlinked.
+    """
+
+    all: tuple[umlproperty, ...]
+    saveable: tuple[umlproperty, ...]
+    derived: tuple[umlproperty, ...]
+    stubs: tuple[umlproperty, ...]
+    unlinkable: tuple[umlproperty, ...]
+
+
+_property_tables_version = 0
+
+
+def property_table(class_: type) -> PropertyTable:
+    """The property table of a class.
+
+    The table is kept on the class. It is rebuilt once a umlproperty
+    is created or added to any class, since it may end up on this
+    class or one of its base classes.
+    """
+    try:
+        version, table = class_.__dict__["_property_table"]
+    except KeyError:
+        pass
+    else:
+        if version == _property_tables_version:
+            return table  # type: ignore[no-any-return]
+
+    props = []
+    for name in dir(class_):
+        if not name.startswith("_"):
+            prop = getattr(class_, name)
+            if isinstance(prop, umlproperty):
+                props.append(prop)
+
+    def kind(prop):
+        if isinstance(prop, redefine):
+            if prop.original.name != prop.name:
+                return None
+            prop = prop.original
+        if isinstance(prop, derived):
+            return derived
+        if isinstance(prop, associationstub):
+            return associationstub
+        return umlproperty
+
+    kinds = [kind(prop) for prop in props]
+    table = PropertyTable(
+        all=tuple(props),
+        saveable=tuple(p for p, k in zip(props, kinds) if k is umlproperty),
+        derived=tuple(p for p, k in zip(props, kinds) if k is derived),
+        stubs=tuple(p for p, k in zip(props, kinds) if k is associationstub),
+        unlinkable=tuple(
+            p for p, k in zip(props, kinds) if k in (umlproperty, associationstub)
+        ),
+    )
+    setattr(class_, "_property_table", (_property_tables_version, table))
+    return table
+
+
+def invalidate_property_tables() -> None:
+    """Rebuild the property tables of all classes on next use."""
+    global _property_tables_version
+    _property_tables_version += 1
@@ -74,6 +74,10 @@ class StyleSheet(Element):
             SYSTEM_STYLE_SHEET, self.styleSheet
         )
 
+    @property
+    def compiled_style_sheet(self) -> CompiledStyleSheet:
+        return self._compiled_style_sheet
+
     def match(self, node: StyleNode) -> Style:
         return self._compiled_style_sheet.match(node)
 
@@ -2,7 +2,8 @@
 
 import pytest
 
-from gaphor.core.modeling.collection import collection, collectionlist
+from gaphor.core.modeling.collection import collection, collectionlist, orderedset
+from gaphor.UML import Class, Package
 
 
 class MockElement:
@@ -134,3 +135,149 @@ def test_swap():
     c.swap("a", "c")
     assert c.items == ["c", "b", "a"]
     assert o.events
+
+
+def test_collection_items_are_an_ordered_set():
+    c: collection[str] = collection(MockProperty(), None, str)
+
+    assert isinstance(c.items, orderedset)
+    assert not c
+
+
+def test_ordered_set_keeps_insertion_order():
+    s = orderedset(["a", "b", "c"])
+    s.remove("a")
+    s.append("a")
+    s.append("b")
+
+    assert list(s) == ["b", "c", "a"]
+    assert s == ["b", "c", "a"]
+    assert len(s) == 3
+    assert s.index("a") == 2
+    assert s[-1] == "a"
+    assert s[1:] == ["c", "a"]
+
+
+def test_ordered_set_remove_unknown_item():
+    s = orderedset(["a"])
+
+    with pytest.raises(ValueError):
+        s.remove("b")
+
+
+def test_ordered_set_pop():
+    s = orderedset(["a", "b"])
+    s[0]
+
+    assert s.pop() == "b"
+    assert list(s) == ["a"]
+
+
+def test_ordered_set_iteration_is_not_affected_by_changes():
+    s = orderedset(["a", "b", "c"])
+
+    for v in s:
+        s.remove(v)
+
+    assert not s
+
+
+@pytest.mark.parametrize(
+    "change",
+    [
+        lambda s: s.append("d"),
+        lambda s: s.remove("b"),
+        lambda s: s.remove("c"),
+        lambda s: s.pop(),
+        lambda s: s.sort(reverse=True),
+        lambda s: s.__setitem__(0, "d"),
+    ],
+)
+def test_ordered_set_iterator_returns_a_snapshot(change):
+    s = orderedset(["a", "b", "c"])
+    it = iter(s)
+
+    assert next(it) == "a"
+    change(s)
+
+    assert list(it) == ["b", "c"]
+
+
+def test_ordered_set_interleaved_remove_and_iterate():
+    s = orderedset(range(10))
+
+    for n in range(0, 10, 2):
+        s.remove(n)
+        assert list(s) == [v for v in range(10) if v > n or v % 2]
+
+    assert s == [1, 3, 5, 7, 9]
+    assert s.index(7) == 3
+    assert s[-1] == 9
+
+
+def test_ordered_set_remove_from_middle_and_end():
+    s = orderedset(["a", "b", "c", "d"])
+    s.remove("b")
+    s.remove("c")
+    s.remove("d")
+
+    assert s == ["a"]
+    assert s._list == ["a"]
+    assert s.pop() == "a"
+    assert not s
+
+
+def test_ordered_set_compacts_gaps():
+    s = orderedset(range(100))
+
+    for n in range(0, 98):
+        s.remove(n)
+
+    assert len(s._list) <= 2 * len(s)
+    assert s == [98, 99]
+
+
+def test_ordered_set_swap():
+    o = MockElement()
+    c: collection[str] = collection(None, o, str)
+    c.items = orderedset(["a", "b", "c"])
+    c.swap("a", "c")
+
+    assert list(c) == ["c", "b", "a"]
+
+
+def test_ordered_set_order():
+    o = MockElement()
+    c: collection[str] = collection(None, o, str)
+    c.items = orderedset(["b", "c", "a"])
+    c.order(lambda v: v)
+
+    assert list(c) == ["a", "b", "c"]
+
+
+def test_ordered_set_queries(element_factory):
+    package = element_factory.create(Package)
+    for name in ("a", "b", "c"):
+        klass = element_factory.create(Class)
+        klass.name = name
+        klass.package = package
+
+    assert list(package.ownedType[:].name) == ["a", "b", "c"]
+    assert package.ownedType['it.name=="b"', 0].name == "b"
+
+
+@pytest.mark.slow
+def test_large_package_performance(element_factory):
+    package = element_factory.create(Package)
+    classes = [element_factory.create(Class) for _ in range(100_000)]
+
+    for klass in classes:
+        klass.package = package
+
+    assert all(klass in package.ownedType for klass in classes)
+    assert len(package.ownedType) == 100_000
+
+    for klass in classes:
+        del klass.package
+
+    assert not package.ownedType
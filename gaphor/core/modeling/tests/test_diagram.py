@@ -4,6 +4,7 @@ import pytest
 from gaphor.core.eventmanager import EventManager
 from gaphor.core.modeling import Diagram, ElementFactory, Presentation, StyleSheet
 from gaphor.core.modeling.elementdispatcher import ElementDispatcher
+from gaphor.transaction import Transaction
 from gaphor.UML.modelinglanguage import UMLModelingLanguage
 
 
@@ -58,6 +59,41 @@ def test_canvas_is_unlinked(element_factory):
     assert example.test_unlinked
 
 
+def test_lookup_item(element_factory):
+    diagram = element_factory.create(Diagram)
+    example = diagram.create(Example)
+
+    assert diagram.lookup(example.id) is example
+
+    example.unlink()
+
+    assert diagram.lookup(example.id) is None
+
+
+def test_lookup_does_not_find_items_on_other_diagrams(element_factory):
+    diagram = element_factory.create(Diagram)
+    other = element_factory.create(Diagram)
+    example = other.create(Example)
+
+    assert diagram.lookup(example.id) is None
+    assert diagram.lookup(other.id) is None
+
+
+def test_lookup_item_not_registered_in_model(element_factory):
+    diagram = element_factory.create(Diagram)
+    example = Example(diagram, "example")
+
+    assert diagram.lookup("example") is example
+
+
+@pytest.mark.slow
+def test_lookup_performance(element_factory):
+    diagram = element_factory.create(Diagram)
+    items = [diagram.create(Example) for _ in range(1_000)]
+
+    assert [diagram.lookup(item.id) for item in items] == items
+
+
 def test_can_only_add_diagram_items(element_factory):
     diagram = element_factory.create(Diagram)
 
@@ -72,11 +108,24 @@ def test_diagram_stylesheet(element_factory):
     assert diagram.styleSheet is styleSheet
 
 
+def test_diagram_stylesheet_follows_create_and_unlink(element_factory):
+    diagram = element_factory.create(Diagram)
+    assert diagram.styleSheet is None
+
+    styleSheet = element_factory.create(StyleSheet)
+    assert diagram.styleSheet is styleSheet
+
+    styleSheet.unlink()
+    assert diagram.styleSheet is None
+
+
 class ViewMock:
     def __init__(self):
+        self.requests = []
         self.removed_items = set()
 
     def request_update(self, items, removed_items) -> None:
+        self.requests.append((list(items), list(removed_items)))
         self.removed_items.update(removed_items)
 
 
@@ -93,3 +142,191 @@ def test_remove_presentation_triggers_view(element_factory):
     assert example.diagram is None
     assert example not in diagram.ownedPresentation
     assert example in view.removed_items
+
+
+def test_update_requests_are_sent_immediately(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    diagram.request_update(example)
+    diagram.request_update(example)
+
+    assert view.requests == [([example], []), ([example], [])]
+
+
+def test_update_requests_are_sent_immediately_in_transaction(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    with Transaction(element_factory.event_manager):
+        diagram.request_update(example)
+        assert view.requests == [([example], [])]
+
+
+def test_update_requests_are_merged_in_update_batch(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    with element_factory.update_batch():
+        for _ in range(3):
+            diagram.request_update(example)
+        assert not view.requests
+
+    assert view.requests == [([example], [])]
+    assert diagram.update_request_statistics.requests == 3
+    assert diagram.update_request_statistics.merged == 2
+    assert diagram.update_request_statistics.flushes == 1
+
+
+def test_nested_update_batches_are_flushed_once(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    with element_factory.update_batch():
+        with element_factory.update_batch():
+            diagram.request_update(example)
+        assert not view.requests
+
+    assert view.requests == [([example], [])]
+
+
+def test_update_generation_changes_on_update_request(element_factory):
+    diagram = element_factory.create(Diagram)
+    example = diagram.create(Example)
+    generation = diagram.update_generation(example)
+
+    diagram.request_update(example)
+
+    assert diagram.update_generation(example) != generation
+
+
+def test_update_generation_changes_on_update(element_factory):
+    diagram = element_factory.create(Diagram)
+    example = diagram.create(Example)
+    generation = diagram.update_generation(example)
+
+    diagram.update_now((example,))
+
+    assert diagram.update_generation(example) != generation
+
+
+def test_removed_items_are_not_updated_after_update_batch(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    with element_factory.update_batch():
+        diagram.request_update(example)
+        example.unlink()
+
+    assert view.requests == [([], [example])]
+
+
+def test_update_requests_are_sent_if_update_batch_fails(element_factory):
+    diagram = element_factory.create(Diagram)
+    view = ViewMock()
+    diagram.register_view(view)
+    example = diagram.create(Example)
+    view.requests.clear()
+
+    with pytest.raises(ValueError), element_factory.update_batch():
+        diagram.request_update(example)
+        raise ValueError()
+
+    assert view.requests == [([example], [])]
+
+
+def watched_subject(diagram, element_factory):
+    example = diagram.create(Example, subject=element_factory.create(Diagram))
+    events = []
+    example.watch("subject[Diagram].name", events.append)
+    return example, events
+
+
+def test_diagram_without_views_does_not_watch_the_model(element_factory):
+    diagram = element_factory.create(Diagram)
+    example, events = watched_subject(diagram, element_factory)
+
+    example.subject.name = "name"
+
+    assert not diagram.awake
+    assert not events
+
+
+def test_diagram_wakes_up_when_view_is_registered(element_factory):
+    diagram = element_factory.create(Diagram)
+    example, events = watched_subject(diagram, element_factory)
+    example.subject.name = "name"
+
+    diagram.register_view(ViewMock())
+    # Brings the item up to date
+    assert events == [None]
+
+    example.subject.name = "other name"
+
+    assert diagram.awake
+    assert len(events) == 2
+    assert events[1].new_value == "other name"
+
+
+def test_items_created_in_awake_diagram_watch_the_model(element_factory):
+    diagram = element_factory.create(Diagram)
+    diagram.register_view(ViewMock())
+    example, events = watched_subject(diagram, element_factory)
+
+    example.subject.name = "name"
+
+    assert len(events) == 1
+
+
+def test_diagram_falls_asleep_when_last_view_is_unregistered(element_factory):
+    diagram = element_factory.create(Diagram)
+    view1, view2 = ViewMock(), ViewMock()
+    diagram.register_view(view1)
+    diagram.register_view(view2)
+    example, events = watched_subject(diagram, element_factory)
+
+    diagram.unregister_view(view1)
+    example.subject.name = "name"
+    diagram.unregister_view(view2)
+    example.subject.name = "other name"
+
+    assert not diagram.awake
+    assert len(events) == 1
+
+
+def test_diagram_wakes_up_when_updated(element_factory):
+    diagram = element_factory.create(Diagram)
+    example, events = watched_subject(diagram, element_factory)
+
+    diagram.update_now((example,))
+    example.subject.name = "name"
+
+    assert diagram.awake
+    assert len(events) == 2
+
+
+def test_item_own_properties_are_watched_while_asleep(element_factory):
+    diagram = element_factory.create(Diagram)
+    example = diagram.create(Example)
+    events = []
+    example.watch("subject", events.append)
+
+    example.subject = element_factory.create(Diagram)
+
+    assert not diagram.awake
+    assert len(events) == 1
@@ -2,7 +2,13 @@ import gaphas
 import pytest
 
 from gaphor.core.eventmanager import EventManager
-from gaphor.core.modeling import ElementFactory, Presentation, StyleSheet
+from gaphor.core.modeling import (
+    Comment,
+    Element,
+    ElementFactory,
+    Presentation,
+    StyleSheet,
+)
 from gaphor.core.modeling.diagram import (
     FALLBACK_STYLE,
     Diagram,
@@ -71,3 +77,89 @@ def test_system_style_sheet_covers_fallback_styles(diagram):
 
     for prop, value in FALLBACK_STYLE.items():
         assert style[prop] == value
+
+
+@pytest.fixture
+def style_sheet(element_factory):
+    style_sheet = element_factory.create(StyleSheet)
+    style_sheet.styleSheet = "demo[note=x] { color: #00ff00 }"
+    return style_sheet
+
+
+def test_item_style_follows_attribute_change(diagram, style_sheet):
+    item = diagram.create(DemoItem)
+    assert diagram.item_style(item)["color"] != (0, 1, 0, 1)
+
+    item.note = "x"
+
+    assert diagram.item_style(item)["color"] == (0, 1, 0, 1)
+
+
+def test_item_style_follows_style_sheet_change(diagram, style_sheet):
+    item = diagram.create(DemoItem)
+    item.note = "x"
+    diagram.item_style(item)
+
+    style_sheet.styleSheet = "demo[note=x] { color: #ff0000 }"
+
+    assert diagram.item_style(item)["color"] == (1, 0, 0, 1)
+
+
+def test_item_style_follows_computed_attribute(diagram, style_sheet):
+    class ComputedItem(DemoItem):
+        computed = "false"
+
+    style_sheet.styleSheet = "computed[computed=true] { color: #00ff00 }"
+    item = diagram.create(ComputedItem)
+    assert diagram.item_style(item)["color"] != (0, 1, 0, 1)
+
+    item.computed = "true"
+
+    assert diagram.item_style(item)["color"] == (0, 1, 0, 1)
+
+
+def test_item_style_is_kept_until_item_changes(diagram, style_sheet):
+    item = diagram.create(DemoItem)
+    style = diagram.item_style(item)
+    misses = style_sheet.compiled_style_sheet.cache_info().misses
+
+    assert diagram.item_style(item) is style
+    assert style_sheet.compiled_style_sheet.cache_info().misses == misses
+
+    item.note = "x"
+
+    assert diagram.item_style(item) is not style
+
+
+def test_item_style_follows_subject_change(diagram, element_factory, style_sheet):
+    item = diagram.create(DemoItem, subject=element_factory.create(Element))
+    assert diagram.item_style(item)["color"] != (0, 1, 0, 1)
+
+    item.subject.note = "x"
+
+    assert diagram.item_style(item)["color"] == (0, 1, 0, 1)
+
+
+def test_item_style_follows_change_along_attribute_path(
+    diagram, element_factory, style_sheet
+):
+    style_sheet.styleSheet = "demo[comment.body=x] { color: #00ff00 }"
+    item = diagram.create(DemoItem, subject=element_factory.create(Element))
+    comment = element_factory.create(Comment)
+    comment.annotatedElement = item.subject
+    assert diagram.item_style(item)["color"] != (0, 1, 0, 1)
+
+    comment.body = "x"
+
+    assert diagram.item_style(item)["color"] == (0, 1, 0, 1)
+
+
+def test_item_style_follows_parent_change(diagram, style_sheet):
+    style_sheet.styleSheet = "demo[note=x] > demo { color: #00ff00 }"
+    parent = diagram.create(DemoItem)
+    item = diagram.create(DemoItem, parent=parent)
+    assert diagram.item_style(item)["color"] != (0, 1, 0, 1)
+
+    parent.note = "x"
+
+    assert diagram.item_style(item)["color"] == (0, 1, 0, 1)
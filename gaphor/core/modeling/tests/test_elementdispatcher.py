@@ -235,6 +235,166 @@ def test_notification_with_incompatible_elements(
     assert len(event.events) == 2, event.events
 
 
+def test_compiled_paths_are_shared(dispatcher, element_factory, event):
+    path = "ownedOperation.ownedParameter.name"
+    c1 = element_factory.create(UML.Class)
+    c2 = element_factory.create(UML.Class)
+    c1.ownedOperation = element_factory.create(UML.Operation)
+    c2.ownedOperation = element_factory.create(UML.Operation)
+
+    dispatcher.subscribe(event.handler, c1, path)
+    dispatcher.subscribe(event.handler, c2, path)
+    dispatcher.subscribe(event.handler, c1, "ownedOperation.name")
+
+    remainders1 = dispatcher._handlers[c1, UML.Class.ownedOperation][event.handler]
+    remainders2 = dispatcher._handlers[c2, UML.Class.ownedOperation][event.handler]
+
+    assert len(dispatcher._paths) == 2
+    assert len(remainders1) == 2
+    assert remainders2 < remainders1
+
+
+def test_handlers_without_remainders_share_storage(dispatcher, element_factory, event):
+    c1 = element_factory.create(UML.Class)
+    c2 = element_factory.create(UML.Class)
+
+    dispatcher.subscribe(event.handler, c1, "name")
+    dispatcher.subscribe(event.handler, c2, "name")
+
+    assert (
+        dispatcher._handlers[c1, UML.Class.name][event.handler]
+        is dispatcher._handlers[c2, UML.Class.name][event.handler]
+    )
+
+
+CLASS_ITEM_PATHS = [
+    "ownedAttribute",
+    "ownedAttribute.association",
+    "ownedAttribute.name",
+    "ownedAttribute.isStatic",
+    "ownedAttribute.isDerived",
+    "ownedAttribute.visibility",
+    "ownedAttribute.lowerValue",
+    "ownedAttribute.upperValue",
+    "ownedAttribute.defaultValue",
+    "ownedAttribute.type",
+    "ownedAttribute.typeValue",
+    "ownedOperation",
+    "ownedOperation.name",
+    "ownedOperation.isAbstract",
+    "ownedOperation.isStatic",
+    "ownedOperation.visibility",
+    "ownedOperation.ownedParameter.lowerValue",
+    "ownedOperation.ownedParameter.upperValue",
+    "ownedOperation.ownedParameter.typeValue",
+    "ownedOperation.ownedParameter.defaultValue",
+    "appliedStereotype",
+    "appliedStereotype.classifier.name",
+    "appliedStereotype.slot",
+    "appliedStereotype.slot.definingFeature.name",
+    "appliedStereotype.slot.value",
+]
+
+
+@pytest.mark.slow
+def test_subscribe_and_unsubscribe_performance(dispatcher, element_factory):
+    classes = []
+    for _ in range(2000):
+        c = element_factory.create(UML.Class)
+        for _ in range(5):
+            c.ownedAttribute = element_factory.create(UML.Property)
+        for _ in range(3):
+            o = c.ownedOperation = element_factory.create(UML.Operation)
+            for _ in range(2):
+                o.ownedParameter = element_factory.create(UML.Parameter)
+        classes.append(c)
+    handlers = [Event().handler for _ in classes]
+
+    for c, handler in zip(classes, handlers):
+        for path in CLASS_ITEM_PATHS:
+            dispatcher.subscribe(handler, c, path)
+
+    assert len(dispatcher._reverse) == len(handlers)
+
+    for handler in handlers:
+        dispatcher.unsubscribe(handler)
+
+    assert not dispatcher._handlers
+    assert not dispatcher._reverse
+
+
+def test_rebuild_follows_associations_set_while_events_were_blocked(
+    dispatcher, event_manager
+):
+    element_factory = ElementFactory(event_manager, dispatcher)
+    c = element_factory.create(UML.Class)
+    event1, event2 = Event(), Event()
+    dispatcher.subscribe(event1.handler, c, "ownedOperation.name")
+    dispatcher.subscribe(event2.handler, c, "ownedOperation.name")
+
+    with element_factory.block_events():
+        o = c.ownedOperation = element_factory.create(UML.Operation)
+    status = list(dispatcher.rebuild_generator())
+    o.name = "op"
+
+    assert status[-1] == 100
+    assert len(event1.events) == 1
+    assert len(event2.events) == 1
+
+
+def test_rebuild_of_nested_paths(dispatcher, event_manager, event):
+    element_factory = ElementFactory(event_manager, dispatcher)
+    c = element_factory.create(UML.Class)
+    dispatcher.subscribe(event.handler, c, "ownedOperation.ownedParameter.name")
+    dispatcher.subscribe(event.handler, c, "ownedOperation.name")
+
+    with element_factory.block_events():
+        o = c.ownedOperation = element_factory.create(UML.Operation)
+        p = o.ownedParameter = element_factory.create(UML.Parameter)
+    list(dispatcher.rebuild_generator())
+    p.name = "param"
+
+    assert len(event.events) == 1
+    assert dispatcher._handlers[o, UML.Operation.ownedParameter]
+
+
+def test_model_ready_rebuilds_dispatcher(dispatcher, event_manager, event):
+    element_factory = ElementFactory(event_manager, dispatcher)
+    c = element_factory.create(UML.Class)
+    dispatcher.subscribe(event.handler, c, "ownedAttribute.name")
+
+    with element_factory.block_events():
+        a = c.ownedAttribute = element_factory.create(UML.Property)
+    element_factory.model_ready()
+    a.name = "attr"
+
+    assert len(event.events) == 1
+
+
+@pytest.mark.slow
+def test_rebuild_performance(dispatcher, event_manager):
+    element_factory = ElementFactory(event_manager, dispatcher)
+    classes = [element_factory.create(UML.Class) for _ in range(1000)]
+    for c in classes:
+        handler = Event().handler
+        for path in CLASS_ITEM_PATHS:
+            dispatcher.subscribe(handler, c, path)
+
+    with element_factory.block_events():
+        for c in classes:
+            for _ in range(5):
+                c.ownedAttribute = element_factory.create(UML.Property)
+            for _ in range(3):
+                o = c.ownedOperation = element_factory.create(UML.Operation)
+                for _ in range(2):
+                    o.ownedParameter = element_factory.create(UML.Parameter)
+
+    for _ in dispatcher.rebuild_generator():
+        pass
+
+    assert len(dispatcher._handlers) > len(classes) * len(CLASS_ITEM_PATHS)
+
+
 class A(Element):
     one: association
     two: association
@@ -4,7 +4,7 @@ import pytest
 
 from gaphor.core import event_handler
 from gaphor.core.eventmanager import EventManager
-from gaphor.core.modeling import ElementFactory
+from gaphor.core.modeling import Diagram, Element, ElementFactory
 from gaphor.core.modeling.event import (
     ElementCreated,
     ElementDeleted,
@@ -13,7 +13,8 @@ from gaphor.core.modeling.event import (
     ServiceEvent,
 )
 from gaphor.core.modeling.presentation import Presentation
-from gaphor.UML import Parameter
+from gaphor.diagram.general import CommentItem
+from gaphor.UML import Class, Parameter
 
 
 @pytest.fixture
@@ -139,3 +140,57 @@ def test_no_create_events_when_blocked(element_factory):
     with element_factory.block_events():
         element_factory.create(Parameter)
     assert events == [], events
+
+
+def test_select_by_type(factory):
+    p = factory.create(Parameter)
+    c = factory.create(Class)
+
+    assert factory.lselect(Parameter) == [p]
+    assert factory.lselect(Class) == [c]
+    assert factory.lselect(Element) == [p, c]
+
+
+def test_select_by_type_after_unlink(factory):
+    p = factory.create(Parameter)
+    c = factory.create(Class)
+
+    p.unlink()
+
+    assert factory.lselect(Parameter) == []
+    assert factory.lselect(Element) == [c]
+
+
+def test_select_by_type_includes_presentations(factory):
+    diagram = factory.create(Diagram)
+    item = diagram.create(CommentItem)
+
+    assert factory.lselect(Presentation) == [item]
+
+    item.unlink()
+
+    assert factory.lselect(Presentation) == []
+
+
+def test_lookup_singleton(factory):
+    assert factory.lookup_singleton(Class) is None
+
+    c = factory.create(Class)
+    factory.create(Class)
+
+    assert factory.lookup_singleton(Class) is c
+
+    c.unlink()
+
+    assert factory.lookup_singleton(Class) is factory.lselect(Class)[0]
+
+
+@pytest.mark.slow
+def test_select_by_type_performance(factory):
+    parameters = [factory.create(Parameter) for _ in range(50_000)]
+    klass = factory.create(Class)
+
+    for _ in range(10):
+        assert factory.lselect(Class) == [klass]
+
+    assert factory.lselect(Parameter) == parameters
@@ -12,6 +12,7 @@ from gaphor.core.modeling.properties import (
     derived,
     derivedunion,
     enumeration,
+    property_table,
     relation_many,
     relation_one,
 )
@@ -508,6 +509,107 @@ def test_derivedunion_listmixins():
     assert sorted(list(a.u[:].name)) == ["bar", "baz", "foo"]
 
 
+def test_derivedunion_is_invalidated_per_element():
+    class A(Element):
+        a: relation_many[A]
+        u: relation_many[A]
+
+    A.a = association("a", A)
+    A.u = derivedunion("u", A, 0, "*", A.a)
+
+    a1 = A()
+    a2 = A()
+    a1.a = A()
+    a2.a = A()
+    assert len(a1.u) == 1
+    assert len(a2.u) == 1
+    cache = a2._u
+
+    a1.a = b = A()
+
+    assert len(a1.u) == 2
+    assert b in a1.u
+    assert a2._u is cache
+
+
+def test_derivedunion_with_derived_subset_is_invalidated_for_all_elements():
+    class A(Element):
+        a: relation_many[A]
+        other: relation_one[A]
+        d: relation_many[A]
+        u: relation_many[A]
+
+    A.a = association("a", A)
+    A.other = association("other", A, upper=1)
+    A.d = derived("d", A, 0, "*", lambda self: list(self.other.a), A.other, A.a)
+    A.u = derivedunion("u", A, 0, "*", A.d)
+
+    a1 = A()
+    a2 = A()
+    a1.other = a2
+    assert not A.u.local
+    assert len(a1.u) == 0
+
+    a2.a = b = A()
+
+    assert b in a1.u
+
+
+def test_subsets_added_later_invalidate_derivedunion():
+    class A(Element):
+        a: relation_many[A]
+        b: relation_many[A]
+        u: relation_many[A]
+
+    A.a = association("a", A)
+    A.b = association("b", A)
+    A.u = derivedunion("u", A, 0, "*", A.a)
+    A.u.subsets.add(A.b)
+
+    a = A()
+    assert len(a.u) == 0
+
+    a.b = b = A()
+
+    assert b in a.u
+
+
+def test_cached_derivedunion_equals_union():
+    class A(Element):
+        a: relation_many[A]
+        b: relation_one[A]
+        parent: relation_one[A]
+        u: relation_many[A]
+        owner: relation_one[A]
+
+    A.a = association("a", A, opposite="parent")
+    A.parent = association("parent", A, upper=1, opposite="a")
+    A.b = association("b", A, upper=1)
+    A.u = derivedunion("u", A, 0, "*", A.a, A.b)
+    A.owner = derivedunion("owner", A, 0, 1, A.parent)
+
+    elements = [A() for _ in range(5)]
+    edits = [
+        lambda: setattr(elements[0], "a", elements[1]),
+        lambda: setattr(elements[2], "a", elements[1]),
+        lambda: setattr(elements[0], "b", elements[3]),
+        lambda: setattr(elements[1], "b", elements[0]),
+        lambda: elements[2].a.remove(elements[1]),
+        lambda: setattr(elements[4], "parent", elements[0]),
+        lambda: delattr(elements[0], "b"),
+        lambda: elements[3].unlink(),
+    ]
+
+    for edit in edits:
+        for e in elements:
+            e.u
+            e.owner
+        edit()
+        for e in elements:
+            assert sorted(e.u, key=id) == sorted(A.u._union(e), key=id)
+            assert e.owner is e.parent
+
+
 def test_composite():
     class A(Element):
         is_unlinked = False
@@ -533,3 +635,93 @@ def test_composite():
     a.unlink()
     assert a.is_unlinked
     assert b.is_unlinked
+
+
+def test_property_table():
+    class A(Element):
+        a: relation_many[A]
+        name: attribute[str]
+        u: relation_many[A]
+
+    A.a = association("a", A)
+    A.name = attribute("name", str)
+    A.u = derivedunion("u", A, 0, "*", A.a)
+
+    table = property_table(A)
+
+    assert A.a in table.saveable
+    assert A.name in table.saveable
+    assert A.u not in table.saveable
+    assert A.u in table.derived
+    assert A.u not in table.unlinkable
+    assert table.all == tuple(A.umlproperties())
+    assert property_table(A) is table
+
+
+def test_property_table_is_cleared_when_association_stub_is_added():
+    class A(Element):
+        b: relation_many[B]
+
+    class B(Element):
+        pass
+
+    class C(B):
+        pass
+
+    A.b = association("b", B)
+    b_table = property_table(B)
+    c_table = property_table(C)
+    assert not b_table.stubs
+
+    a = A()
+    a.b = C()
+
+    assert property_table(B) is not b_table
+    assert property_table(C) is not c_table
+    assert property_table(C).stubs == (A.b.stub,)
+    assert A.b.stub in property_table(C).unlinkable
+
+
+def test_property_table_is_cleared_when_property_is_added_later():
+    class A(Element):
+        name: attribute[str]
+
+    class B(A):
+        note: attribute[str]
+
+    A.name = attribute("name", str)
+    b = B()
+    b.name = "b"
+    saved = {}
+    b.save(saved.__setitem__)
+    assert saved == {"name": "b"}
+
+    B.note = attribute("note", str)
+    b.note = "note"
+    b.save(saved.__setitem__)
+
+    assert saved == {"name": "b", "note": "note"}
+    assert B.note in property_table(B).saveable
+
+
+@pytest.mark.slow
+def test_derivedunion_performance(element_factory):
+    from gaphor.UML import Class, Package, Property
+
+    package = element_factory.create(Package)
+    classes = []
+    for _ in range(500):
+        klass = element_factory.create(Class)
+        klass.package = package
+        for _ in range(10):
+            klass.ownedAttribute = element_factory.create(Property)
+        classes.append(klass)
+
+    for klass in classes[:50]:
+        klass.ownedAttribute = element_factory.create(Property)
+        for c in classes:
+            c.ownedElement
+            c.owner
+
+    assert [len(c.ownedElement) for c in classes] == [11] * 50 + [10] * 450
+    assert all(c.owner is package for c in classes)
@@ -1,7 +1,20 @@
 from __future__ import annotations
 
 import operator
-from typing import Callable, Dict, Iterator, Literal, Protocol, Sequence, Tuple, Union
+from collections import OrderedDict
+from itertools import chain
+from typing import (
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    Literal,
+    NamedTuple,
+    Protocol,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import tinycss2
 
@@ -45,6 +58,10 @@ Rule = Union[
     Tuple[Literal["error"], Union[tinycss2.ast.ParseError, SelectorError]],
 ]
 
+SelectorEntry = Tuple[
+    Callable[[StyleNode], bool], Tuple[int, int, int], int, Dict[str, object]
+]
+
 
 def merge_styles(*styles: Style) -> Style:
     style = Style()
@@ -68,19 +85,103 @@ def merge_styles(*styles: Style) -> Style:
     return style
 
 
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
 class CompiledStyleSheet:
-    def __init__(self, *css: str):
+    """A style sheet, ready to match style nodes.
+
+    Match results are cached. The cache key is a fingerprint of the node,
+    consisting of only those parts of the node (and its ancestors) the
+    selectors depend on. Style sheets containing selectors that depend on
+    child nodes (``:has()``, ``:empty``) are not cached.
+
+    Selectors are grouped by the node name they apply to, so only
+    selectors that can possibly match a node are evaluated.
+
+    Like a compiled selector, the style sheet tells which ``attributes``
+    are queried and whether it looks at ``ancestors`` or ``descendants``
+    of a node.
+    """
+
+    def __init__(self, *css: str, cache_size: int = 1024):
         self.selectors = [
             (selspec[0], selspec[1], order, declarations)
             for order, (selspec, declarations) in enumerate(parse_style_sheets(*css))
             if selspec != "error"
         ]
 
+        self._universal_selectors: list[SelectorEntry] = []
+        self._selectors_by_name: dict[str, list[SelectorEntry]] = {}
+        for sel, specificity, order, declarations in self.selectors:
+            entry = (sel.match, specificity, order, declarations)
+            if sel.local_name is None:
+                self._universal_selectors.append(entry)
+            else:
+                self._selectors_by_name.setdefault(sel.local_name, []).append(entry)
+
+        compiled = [sel for sel, *_ in self.selectors]
+        self.attributes = tuple(
+            sorted(set().union(*(sel.attributes for sel in compiled)))
+        )
+        self.ancestors = any(sel.ancestors for sel in compiled)
+        self.descendants = any(sel.descendants for sel in compiled)
+        self._cache: OrderedDict[Hashable, Style] = OrderedDict()
+        self._cache_size = cache_size
+        self._hits = 0
+        self._misses = 0
+
+    def cache_info(self) -> CacheInfo:
+        """Report statistics of the match cache."""
+        return CacheInfo(self._hits, self._misses, self._cache_size, len(self._cache))
+
+    def fingerprint(self, node: StyleNode) -> Hashable:
+        """The parts of a node that are relevant for matching."""
+        attributes = self.attributes
+        ancestors = self.ancestors
+        key = []
+        current: StyleNode | None = node
+        while current:
+            key.append(
+                (
+                    current.name(),
+                    tuple(current.state()),
+                    tuple(current.attribute(a) for a in attributes),
+                )
+            )
+            current = current.parent() if ancestors else None
+        return tuple(key)
+
     def match(self, node: StyleNode) -> Style:
+        if self.descendants:
+            return self._match(node)
+
+        cache = self._cache
+        key = self.fingerprint(node)
+        try:
+            style = cache[key]
+        except KeyError:
+            self._misses += 1
+            style = cache[key] = self._match(node)
+            if len(cache) > self._cache_size:
+                cache.popitem(last=False)
+        else:
+            self._hits += 1
+            cache.move_to_end(key)
+        return style
+
+    def _match(self, node: StyleNode) -> Style:
+        candidates = chain(
+            self._selectors_by_name.get(node.name(), ()), self._universal_selectors
+        )
         results = sorted(
             (
                 (specificity, order, declarations)
-                for pred, specificity, order, declarations in self.selectors
+                for pred, specificity, order, declarations in candidates
                 if pred(node)
             ),
             key=MATCH_SORT_KEY,
@@ -18,11 +18,36 @@ def compile_selector_list(input):
     Returns a list of compiled selectors.
     """
     return [
-        (compile_node(selector), selector.specificity)
+        (CompiledSelector(selector), selector.specificity)
         for selector in parser.parse(input)
     ]
 
 
+class CompiledSelector:
+    """A compiled selector.
+
+    Call it with a style node to check if the selector matches. It also
+    tells which parts of a style node the selector depends on:
+
+    * ``local_name``: the node name the selector is restricted to, or
+      ``None`` if it can match any node,
+    * ``attributes``: the attribute names queried,
+    * ``ancestors``: the selector looks at parent nodes,
+    * ``descendants``: the selector looks at child nodes.
+    """
+
+    def __init__(self, selector):
+        self.match = compile_node(selector)
+        self.local_name = rightmost_local_name(selector)
+        self.attributes = set()
+        self.ancestors = False
+        self.descendants = False
+        collect_dependencies(selector, self)
+
+    def __call__(self, el):
+        return self.match(el)
+
+
 @singledispatch
 def compile_node(selector):
     """Dynamic dispatch selector nodes.
@@ -135,3 +160,57 @@ def compile_functional_pseudo_class_selector(
         return lambda el: any(sel(el) for sel, _ in sub_selectors)
     elif name == "not":
         return lambda el: not any(sel(el) for sel, _ in sub_selectors)
+
+
+def rightmost_local_name(selector):
+    """The local name of the rightmost compound selector, if any.
+
+    Only nodes with this name can match the selector.
+    """
+    while isinstance(selector, parser.CombinedSelector):
+        selector = selector.right
+    if isinstance(selector, parser.CompoundSelector):
+        for sel in selector.simple_selectors:
+            if isinstance(sel, parser.LocalNameSelector):
+                return sel.lower_local_name
+    return None
+
+
+@singledispatch
+def collect_dependencies(selector, compiled):
+    """Register the parts of a style node ``selector`` depends on with
+    ``compiled``."""
+
+
+@collect_dependencies.register
+def collect_compound_dependencies(selector: parser.CompoundSelector, compiled):
+    for sel in selector.simple_selectors:
+        collect_dependencies(sel, compiled)
+
+
+@collect_dependencies.register
+def collect_combined_dependencies(selector: parser.CombinedSelector, compiled):
+    compiled.ancestors = True
+    collect_dependencies(selector.left, compiled)
+    collect_dependencies(selector.right, compiled)
+
+
+@collect_dependencies.register
+def collect_attribute_dependencies(selector: parser.AttributeSelector, compiled):
+    compiled.attributes.add(selector.lower_name)
+
+
+@collect_dependencies.register
+def collect_pseudo_class_dependencies(selector: parser.PseudoClassSelector, compiled):
+    if selector.name == "empty":
+        compiled.descendants = True
+
+
+@collect_dependencies.register
+def collect_functional_pseudo_class_dependencies(
+    selector: parser.FunctionalPseudoClassSelector, compiled
+):
+    if selector.name == "has":
+        compiled.descendants = True
+    for sel in parser.parse(selector.arguments):
+        collect_dependencies(sel, compiled)
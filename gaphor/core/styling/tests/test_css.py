@@ -250,3 +250,114 @@ def test_broken_line_style():
     props = compiled_style_sheet.match(Node("mytype"))
 
     assert props.get("line-style") is None
+
+
+def test_match_cache_hit_for_similar_nodes():
+    css = "mytype { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    props1 = compiled_style_sheet.match(Node("mytype"))
+    props2 = compiled_style_sheet.match(Node("mytype"))
+
+    assert props1 == props2
+    assert compiled_style_sheet.cache_info().hits == 1
+    assert compiled_style_sheet.cache_info().misses == 1
+
+
+def test_match_cache_distinguishes_referenced_attributes():
+    css = "mytype[name=foo] { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    foo = compiled_style_sheet.match(Node("mytype", attributes={"name": "foo"}))
+    bar = compiled_style_sheet.match(Node("mytype", attributes={"name": "bar"}))
+
+    assert foo.get("color") == (0, 1, 0, 1)
+    assert bar.get("color") is None
+    assert compiled_style_sheet.cache_info().misses == 2
+
+
+def test_match_cache_ignores_unreferenced_attributes():
+    css = "mytype { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    compiled_style_sheet.match(Node("mytype", attributes={"name": "foo"}))
+    compiled_style_sheet.match(Node("mytype", attributes={"name": "bar"}))
+
+    assert compiled_style_sheet.cache_info().hits == 1
+
+
+def test_match_cache_distinguishes_ancestors():
+    css = "parent[name=foo] mytype { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    foo = compiled_style_sheet.match(
+        Node("mytype", parent=Node("parent", attributes={"name": "foo"}))
+    )
+    bar = compiled_style_sheet.match(
+        Node("mytype", parent=Node("parent", attributes={"name": "bar"}))
+    )
+
+    assert foo.get("color") == (0, 1, 0, 1)
+    assert bar.get("color") is None
+
+
+def test_match_cache_distinguishes_state():
+    css = "mytype:hover { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    hovered = compiled_style_sheet.match(Node("mytype", state=("hover",)))
+    plain = compiled_style_sheet.match(Node("mytype"))
+
+    assert hovered.get("color") == (0, 1, 0, 1)
+    assert plain.get("color") is None
+
+
+def test_match_cache_is_bypassed_for_child_dependent_selectors():
+    css = "mytype:has(child) { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    with_child = compiled_style_sheet.match(Node("mytype", children=[Node("child")]))
+    without_child = compiled_style_sheet.match(Node("mytype"))
+
+    assert with_child.get("color") == (0, 1, 0, 1)
+    assert without_child.get("color") is None
+    assert compiled_style_sheet.cache_info().currsize == 0
+
+
+def test_match_cache_is_bounded():
+    css = "mytype[name=foo] { color: #00ff00 }"
+
+    compiled_style_sheet = CompiledStyleSheet(css, cache_size=2)
+    for name in ("a", "b", "c"):
+        compiled_style_sheet.match(Node("mytype", attributes={"name": name}))
+
+    assert compiled_style_sheet.cache_info().currsize == 2
+
+
+def test_selectors_are_grouped_by_local_name():
+    css = """
+    * { font-size: 10 }
+    mytype { color: #00ff00 }
+    other { color: #ff0000 }
+    parent mytype { font-family: serif }
+    :is(mytype) { line-width: 3 }
+    """
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    props = compiled_style_sheet.match(Node("mytype", parent=Node("parent")))
+
+    assert props == {
+        "font-size": 10,
+        "color": (0, 1, 0, 1),
+        "font-family": "serif",
+        "line-width": 3,
+    }
+
+
+def test_many_rules_only_matching_names_apply():
+    css = "\n".join(f"type{n} {{ font-size: {n} }}" for n in range(500))
+
+    compiled_style_sheet = CompiledStyleSheet(css)
+    props = compiled_style_sheet.match(Node("type42"))
+
+    assert props.get("font-size") == 42
@@ -300,3 +300,39 @@ def test_has_and_is_selector():
             children=[Node("foo", children=[Node("bar", state=("hover",))])],
         )
     )
+
+
+def test_selector_attribute_dependencies():
+    css = "node[name] > child:not([subject.name=x]) {}"
+
+    (selector, specificity), payload = next(parse_style_sheet(css))
+
+    assert selector.attributes == {"name", "subject.name"}
+    assert selector.ancestors
+    assert not selector.descendants
+
+
+@pytest.mark.parametrize("css", ["node:has(child) {}", "node:empty {}"])
+def test_selector_descendant_dependencies(css):
+    (selector, specificity), payload = next(parse_style_sheet(css))
+
+    assert selector.descendants
+    assert not selector.ancestors
+
+
+@pytest.mark.parametrize(
+    "css,local_name",
+    [
+        ["* {}", None],
+        ["node {}", "node"],
+        ["Node {}", "node"],
+        ["parent node {}", "node"],
+        ["parent > node[name] {}", "node"],
+        ["node * {}", None],
+        [":is(node) {}", None],
+    ],
+)
+def test_selector_local_name(css, local_name):
+    (selector, specificity), payload = next(parse_style_sheet(css))
+
+    assert selector.local_name == local_name
@@ -1,14 +1,34 @@
-from typing import Optional
+import functools
+import itertools
+from typing import Dict, Optional
 
 from gaphas.aspect.handlemove import ConnectionSinkType, HandleMove, ItemHandleMove
-from gaphas.item import Line
+from gaphas.item import Item, Line
 from gaphas.segment import LineHandleMove
 from gaphas.types import Pos
 
-from gaphor.diagram.connectors import Connector
+from gaphor.diagram.connectors import Connector, NoConnector
+
+
+@functools.lru_cache()
+def has_connector(element_type, line_type):
+    """Is there a connector registered for the item and line types at all.
+
+    Whether a connector allows a connection depends on the state of the
+    items, but if no connector is registered the items can never be
+    connected.
+    """
+    get_registration = Connector.registry.get_registration
+    for t1, t2 in itertools.product(element_type.__mro__, line_type.__mro__):
+        connector = get_registration(t1, t2)
+        if connector:
+            return connector is not NoConnector
+    return False
 
 
 def connectable(line, handle, element):
+    if not has_connector(type(element), type(line)):
+        return False
     connector = Connector(element, line)
     for port in element.ports():
         allow = connector.allow(handle, port)
@@ -17,20 +37,36 @@ def connectable(line, handle, element):
     return False
 
 
+class GrayedOutItems:
+    """The items a line handle can not be connected to.
+
+    Items are checked when they're looked up, e.g. when they're drawn.
+    Since only visible items are drawn, items in a large diagram are not
+    all checked when a drag starts.
+    """
+
+    def __init__(self, line, handle):
+        self.line = line
+        self.handle = handle
+        self._grayed_out: Dict[Item, bool] = {}
+
+    def __contains__(self, item):
+        try:
+            return self._grayed_out[item]
+        except KeyError:
+            grayed_out = self._grayed_out[item] = not (
+                item is self.line or connectable(self.line, self.handle, item)
+            )
+            return grayed_out
+
+
 @HandleMove.register(Line)
 class GrayOutLineHandleMove(LineHandleMove):
     def start_move(self, pos):
         super().start_move(pos)
         handle = self.handle
         if handle.connectable:
-            line = self.item
-            model = self.view.model
-            selection = self.view.selection
-            selection.grayed_out_items = {
-                item
-                for item in model.get_all_items()
-                if not (item is line or connectable(line, handle, item))
-            }
+            self.view.selection.grayed_out_items = GrayedOutItems(self.item, handle)
 
     def stop_move(self, pos):
         super().stop_move(pos)
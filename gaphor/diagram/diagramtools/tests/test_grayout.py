@@ -0,0 +1,90 @@
+import pytest
+from gaphas.aspect.handlemove import HandleMove
+
+from gaphor import UML
+from gaphor.diagram.connectors import Connector
+from gaphor.diagram.diagramtools.grayout import (
+    GrayedOutItems,
+    connectable,
+    has_connector,
+)
+from gaphor.diagram.general import CommentItem, CommentLineItem
+from gaphor.UML.classes import ClassItem, DependencyItem
+from gaphor.UML.states import StateItem, TransitionItem
+
+
+def test_items_are_grayed_out_if_not_connectable(diagram, element_factory):
+    line = diagram.create(DependencyItem)
+    class_item = diagram.create(ClassItem, subject=element_factory.create(UML.Class))
+    comment_item = diagram.create(
+        CommentItem, subject=element_factory.create(UML.Comment)
+    )
+    comment_line = diagram.create(CommentLineItem)
+
+    grayed_out = GrayedOutItems(line, line.head)
+
+    assert line not in grayed_out
+    assert class_item not in grayed_out
+    assert comment_item in grayed_out
+    assert comment_line in grayed_out
+
+
+def test_items_are_checked_once(diagram, element_factory, monkeypatch):
+    line = diagram.create(DependencyItem)
+    class_item = diagram.create(ClassItem, subject=element_factory.create(UML.Class))
+    calls = []
+
+    def counting_connectable(line, handle, item):
+        calls.append(item)
+        return connectable(line, handle, item)
+
+    monkeypatch.setattr(
+        "gaphor.diagram.diagramtools.grayout.connectable", counting_connectable
+    )
+    grayed_out = GrayedOutItems(line, line.head)
+
+    assert class_item not in grayed_out
+    assert class_item not in grayed_out
+    assert calls == [class_item]
+
+
+def test_no_items_are_checked_when_drag_starts(diagram, element_factory, view):
+    line = diagram.create(DependencyItem)
+    for _ in range(10):
+        diagram.create(ClassItem, subject=element_factory.create(UML.Class))
+
+    handle_move = HandleMove(line, line.head, view)
+    handle_move.start_move((0, 0))
+    grayed_out = view.selection.grayed_out_items
+
+    assert isinstance(grayed_out, GrayedOutItems)
+    assert not grayed_out._grayed_out
+
+    handle_move.stop_move((0, 0))
+    assert not view.selection.grayed_out_items
+
+
+def test_has_connector():
+    assert has_connector(ClassItem, DependencyItem)
+    assert has_connector(CommentItem, CommentLineItem)
+    assert not has_connector(CommentItem, DependencyItem)
+    assert not has_connector(ClassItem, TransitionItem)
+
+
+@pytest.mark.slow
+def test_connectable_performance(diagram, element_factory):
+    line = diagram.create(TransitionItem)
+    items = [
+        diagram.create(ClassItem, subject=element_factory.create(UML.Class))
+        for _ in range(2_000)
+    ] + [
+        diagram.create(StateItem, subject=element_factory.create(UML.State))
+        for _ in range(100)
+    ]
+
+    expected = [
+        any(Connector(item, line).allow(line.head, port) for port in item.ports())
+        for item in items
+    ]
+
+    assert [connectable(line, line.head, item) for item in items] == expected
@@ -8,20 +8,40 @@ and handles).
 
 from __future__ import annotations
 
-from cairo import LINE_JOIN_ROUND
+from weakref import WeakKeyDictionary
+
+from cairo import CONTENT_COLOR_ALPHA, LINE_JOIN_ROUND, Context, RecordingSurface
 
 from gaphor.core.modeling.diagram import DrawContext, StyledItem
 from gaphor.diagram.selection import Selection
 
 
 class ItemPainter:
-    def __init__(self, selection: Selection | None = None):
+    """Draw items.
+
+    With ``cache=True``, the drawing of each item is recorded. As long as
+    an item is not updated, and its style and selection state do not
+    change, the recording is replayed instead of drawing the item again.
+    Style and selection state are part of the cache key, so the cache
+    never has to be invalidated explicitly.
+    Only drawing on plain cairo contexts is cached, free hand drawing
+    always draws the item.
+    """
+
+    def __init__(self, selection: Selection | None = None, cache: bool = False):
         self.selection: Selection = selection or Selection()
+        self._cache: WeakKeyDictionary | None = WeakKeyDictionary() if cache else None
 
     def paint_item(self, item, cairo):
         selection = self.selection
         diagram = item.diagram
         style = diagram.style(StyledItem(item, selection))
+        flags = (
+            item in selection.selected_items,
+            item is selection.focused_item,
+            item is selection.hovered_item,
+            item is selection.dropzone_item,
+        )
 
         cairo.save()
         try:
@@ -29,20 +49,51 @@ class ItemPainter:
             cairo.set_source_rgba(*style["color"])
             cairo.transform(item.matrix_i2c.to_cairo())
 
-            item.draw(
-                DrawContext(
-                    cairo=cairo,
-                    style=style,
-                    selected=(item in selection.selected_items),
-                    focused=(item is selection.focused_item),
-                    hovered=(item is selection.hovered_item),
-                    dropzone=(item is selection.dropzone_item),
-                )
-            )
+            if self._cache is not None and isinstance(cairo, Context):
+                surface, extents = self._recording(item, style, flags)
+                # Fill just the recorded area: painting the unbounded
+                # recording would spoil bounding box calculations.
+                cairo.set_source_surface(surface, 0, 0)
+                cairo.rectangle(*extents)
+                cairo.fill()
+            else:
+                self._draw(item, cairo, style, flags)
 
         finally:
             cairo.restore()
 
+    def _draw(self, item, cairo, style, flags):
+        selected, focused, hovered, dropzone = flags
+        item.draw(
+            DrawContext(
+                cairo=cairo,
+                style=style,
+                selected=selected,
+                focused=focused,
+                hovered=hovered,
+                dropzone=dropzone,
+            )
+        )
+
+    def _recording(self, item, style, flags):
+        assert self._cache is not None
+        key = (item.diagram.update_generation(item), flags, style)
+        try:
+            cached_key, recording = self._cache[item]
+            if cached_key == key:
+                return recording
+        except KeyError:
+            pass
+
+        surface = RecordingSurface(CONTENT_COLOR_ALPHA, None)
+        cairo = Context(surface)
+        cairo.set_line_join(LINE_JOIN_ROUND)
+        cairo.set_source_rgba(*style["color"])
+        self._draw(item, cairo, style, flags)
+        recording = (surface, surface.ink_extents())
+        self._cache[item] = (key, recording)
+        return recording
+
     def paint(self, items, cairo):
         """Draw the items."""
         for item in items:
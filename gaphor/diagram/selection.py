@@ -1,4 +1,4 @@
-from typing import Iterable, Optional, Set
+from typing import Container, Optional
 
 from gaphas.item import Item
 from gaphas.view.selection import Selection as _Selection
@@ -8,11 +8,11 @@ class Selection(_Selection):
     def __init__(self):
         super().__init__()
         self._dropzone_item: Optional[Item] = None
-        self._grayed_out_items: Set[Item] = set()
+        self._grayed_out_items: Container[Item] = frozenset()
 
     def clear(self):
         self._dropzone_item = None
-        self._grayed_out_items.clear()
+        self._grayed_out_items = frozenset()
         super().clear()
 
     @property
@@ -25,9 +25,9 @@ class Selection(_Selection):
             self._dropzone_item = item
 
     @property
-    def grayed_out_items(self) -> Set[Item]:
+    def grayed_out_items(self) -> Container[Item]:
         return self._grayed_out_items
 
     @grayed_out_items.setter
-    def grayed_out_items(self, items: Iterable[Item]) -> None:
-        self._grayed_out_items = set(items)
+    def grayed_out_items(self, items: Container[Item]) -> None:
+        self._grayed_out_items = items
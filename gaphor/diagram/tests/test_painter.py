@@ -0,0 +1,85 @@
+import cairo
+import pytest
+
+from gaphor import UML
+from gaphor.core.modeling import StyleSheet
+from gaphor.diagram.painter import ItemPainter
+from gaphor.diagram.selection import Selection
+from gaphor.UML.classes import ClassItem
+
+
+@pytest.fixture
+def item(diagram, element_factory):
+    item = diagram.create(ClassItem, subject=element_factory.create(UML.Class))
+    diagram.update_now((item,))
+    return item
+
+
+@pytest.fixture
+def draw_count(item, monkeypatch):
+    count = [0]
+    draw = item.draw
+
+    def counting_draw(context):
+        count[0] += 1
+        draw(context)
+
+    monkeypatch.setattr(item, "draw", counting_draw)
+    return count
+
+
+def paint(painter, item):
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 200, 200)
+    painter.paint([item], cairo.Context(surface))
+
+
+def test_painter_draws_items_every_time_by_default(item, draw_count):
+    painter = ItemPainter()
+
+    paint(painter, item)
+    paint(painter, item)
+
+    assert draw_count[0] == 2
+
+
+def test_cached_painter_draws_unchanged_items_once(item, draw_count):
+    painter = ItemPainter(cache=True)
+
+    paint(painter, item)
+    paint(painter, item)
+
+    assert draw_count[0] == 1
+
+
+def test_cached_painter_draws_updated_items(diagram, item, draw_count):
+    painter = ItemPainter(cache=True)
+
+    paint(painter, item)
+    diagram.request_update(item)
+    paint(painter, item)
+
+    assert draw_count[0] == 2
+
+
+def test_cached_painter_draws_items_when_selection_changes(item, draw_count):
+    selection = Selection()
+    painter = ItemPainter(selection, cache=True)
+
+    paint(painter, item)
+    selection.select_items(item)
+    paint(painter, item)
+
+    assert draw_count[0] == 2
+
+
+def test_cached_painter_draws_items_when_style_sheet_changes(
+    element_factory, item, draw_count
+):
+    style_sheet = element_factory.create(StyleSheet)
+    painter = ItemPainter(cache=True)
+
+    paint(painter, item)
+    style_sheet.styleSheet = "* { color: red }"
+    paint(painter, item)
+
+    assert draw_count[0] == 2
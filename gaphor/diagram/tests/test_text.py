@@ -7,6 +7,8 @@ from gaphor.diagram.text import (
     TextAlign,
     TextDecoration,
     text_point_at_line,
+    text_size,
+    text_size_hit_rate,
 )
 
 
@@ -101,3 +103,34 @@ def test_text_with_just_font_as_dict():
     w, h = Layout("Example", {"font-family": "sans", "font-size": 10}).size()
     assert w
     assert h
+
+
+def test_same_text_is_measured_once():
+    font = {"font-family": "sans", "font-size": 10}
+    text_size.cache_clear()
+
+    size = Layout("Example", font).size()
+    other_size = Layout("Example", font).size()
+    info = text_size.cache_info()
+
+    assert size == other_size
+    assert info.misses == 1
+    assert info.hits == 1
+    assert text_size_hit_rate() == 0.5
+
+
+def test_text_is_measured_again_when_font_changes():
+    layout = Layout("Example", {"font-family": "sans", "font-size": 10})
+    text_size.cache_clear()
+
+    layout.size()
+    layout.set_font({"font-family": "sans", "font-size": 20})
+    layout.size()
+
+    assert text_size.cache_info().misses == 2
+
+
+def test_hit_rate_without_lookups():
+    text_size.cache_clear()
+
+    assert text_size_hit_rate() == 0.0
@@ -1,14 +1,84 @@
 """Support classes for dealing with text."""
 from __future__ import annotations
 
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
 from gaphas.canvas import instant_cairo_context
 from gaphas.painter.freehand import FreeHandCairoContext
 from gi.repository import GLib, Pango, PangoCairo
 
 from gaphor.core.styling import FontStyle, FontWeight, Style, TextAlign, TextDecoration
 
+FontId = Tuple[str, Union[float, str], Optional[FontWeight], Optional[FontStyle]]
+
+
+@lru_cache()
+def font_description(font_id: FontId) -> Pango.FontDescription:
+    """A font description, shared by all layouts that use the font."""
+    font_family, font_size, font_weight, font_style = font_id
+    fd = Pango.FontDescription.new()
+    fd.set_family(font_family)
+    fd.set_absolute_size(font_size * Pango.SCALE)
+
+    if font_weight:
+        assert isinstance(font_weight, FontWeight)
+        fd.set_weight(getattr(Pango.Weight, font_weight.name))
+    if font_style:
+        assert isinstance(font_style, FontStyle)
+        fd.set_style(getattr(Pango.Style, font_style.name))
+    return fd
+
+
+def configure_layout(layout, text, font_id, underline, width, text_align):
+    layout.set_font_description(font_description(font_id) if font_id else None)
+    if underline:
+        # TODO: can this be done via Pango attributes instead?
+        layout.set_markup(f"<u>{GLib.markup_escape_text(text)}</u>", length=-1)
+    else:
+        layout.set_text(text, length=-1)
+    layout.set_width(-1 if width == -1 else int(width * Pango.SCALE))
+    layout.set_alignment(getattr(Pango.Alignment, text_align.name))
+
+
+@lru_cache(maxsize=1)
+def measure_layout():
+    """The layout used to measure text."""
+    return PangoCairo.create_layout(instant_cairo_context())
+
+
+@lru_cache(maxsize=4096)
+def text_size(
+    text: str,
+    font_id: FontId | None,
+    underline: bool,
+    width: int,
+    text_align: TextAlign,
+) -> tuple[int, int]:
+    """The size of a text, in pixels.
+
+    Sizes are cached, since the same labels are measured over and over
+    again when items are updated.
+    """
+    layout = measure_layout()
+    configure_layout(layout, text, font_id, underline, width, text_align)
+    return layout.get_pixel_size()  # type: ignore[no-any-return]
+
+
+def text_size_hit_rate() -> float:
+    """The fraction of text sizes that were found in the cache."""
+    info = text_size.cache_info()
+    lookups = info.hits + info.misses
+    return info.hits / lookups if lookups else 0.0
+
 
 class Layout:
+    """A text, with font, width and alignment.
+
+    The size of the text is measured with a shared layout. A Pango layout
+    for drawing is only created once the text is drawn.
+    """
+
     def __init__(
         self,
         text: str = "",
@@ -16,20 +86,37 @@ class Layout:
         text_align: TextAlign = TextAlign.CENTER,
         default_size: tuple[int, int] = (0, 0),
     ):
-        self.layout = PangoCairo.create_layout(instant_cairo_context())
+        self._layout = None
+        self._changed = True
         self.underline = False
-        self.font_id: tuple[
-            str, float | str, FontWeight | None, FontStyle | None
-        ] | None = None
+        self.font_id: FontId | None = None
         self.text = ""
         self.width = -1
+        self.text_align = text_align
         self.default_size = default_size
 
         if font:
             self.set_font(font)
         if text:
             self.set_text(text)
-        self.set_alignment(text_align)
+
+    @property
+    def layout(self):
+        """The Pango layout used to draw the text."""
+        layout = self._layout
+        if layout is None:
+            layout = self._layout = PangoCairo.create_layout(instant_cairo_context())
+        if self._changed:
+            configure_layout(
+                layout,
+                self.text,
+                self.font_id,
+                self.underline,
+                self.width,
+                self.text_align,
+            )
+            self._changed = False
+        return layout
 
     def set(self, text=None, font=None, width=None, text_align=None):
         # Since text expressions can return False, we should also accommodate for that
@@ -51,68 +138,43 @@ class Layout:
         assert font_size, "Font size should be set"
 
         font_id = (font_family, font_size, font_weight, font_style)
-        if font_id == self.font_id:
-            return
-
-        self.font_id = font_id
-
-        fd = Pango.FontDescription.new()
-        fd.set_family(font_family)
-        fd.set_absolute_size(font_size * Pango.SCALE)
-
-        if font_weight:
-            assert isinstance(font_weight, FontWeight)
-            fd.set_weight(getattr(Pango.Weight, font_weight.name))
-        if font_style:
-            assert isinstance(font_style, FontStyle)
-            fd.set_style(getattr(Pango.Style, font_style.name))
-
-        self.layout.set_font_description(fd)
-
         underline = (
             font.get("text-decoration", TextDecoration.NONE) == TextDecoration.UNDERLINE
         )
-
-        if self.underline != underline:
+        if font_id != self.font_id or underline != self.underline:
+            self.font_id = font_id
             self.underline = underline
-            self.update_text()
+            self._changed = True
 
     def set_text(self, text: str) -> None:
         if text != self.text:
             self.text = text
-            self.update_text()
-
-    def update_text(self) -> None:
-        if self.underline:
-            # TODO: can this be done via Pango attributes instead?
-            self.layout.set_markup(
-                f"<u>{GLib.markup_escape_text(self.text)}</u>", length=-1
-            )
-        else:
-            self.layout.set_text(self.text, length=-1)
+            self._changed = True
 
     def set_width(self, width: int) -> None:
-        self.width = width
-        if width == -1:
-            self.layout.set_width(-1)
-        else:
-            self.layout.set_width(int(width * Pango.SCALE))
+        if width != self.width:
+            self.width = width
+            self._changed = True
 
     def set_alignment(self, text_align: TextAlign) -> None:
-        self.layout.set_alignment(getattr(Pango.Alignment, text_align.name))
+        if text_align != self.text_align:
+            self.text_align = text_align
+            self._changed = True
 
     def size(self) -> tuple[int, int]:
         if not self.text:
             return self.default_size
-        self.set_width(self.width)
-        return self.layout.get_pixel_size()  # type: ignore[no-any-return]
+        return text_size(
+            self.text, self.font_id, self.underline, self.width, self.text_align
+        )
 
     def show_layout(self, cr, width=None, default_size=None):
-        layout = self.layout
         if not self.text:
             return default_size or self.default_size
-        if width is not None:
-            layout.set_width(int(width * Pango.SCALE))
+        layout = self.layout
+        if width is None:
+            width = self.width
+        layout.set_width(-1 if width == -1 else int(width * Pango.SCALE))
 
         if isinstance(cr, FreeHandCairoContext):
             PangoCairo.show_layout(cr.cr, layout)
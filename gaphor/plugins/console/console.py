@@ -7,10 +7,11 @@
 #
 
 import code
+import contextlib
 import sys
 import textwrap
 from rlcompleter import Completer
-from typing import Dict, List
+from typing import Callable, ContextManager, Dict, List
 
 from gi.repository import Gdk, Gtk, Pango
 
@@ -96,13 +97,21 @@ class GTKInterpreterConsole(Gtk.ScrolledWindow):
     """An InteractiveConsole for GTK.
 
     It's an actual widget, so it can be dropped in just about anywhere.
+
+    Source is executed within ``run_context()``.
     """
 
     __gtype_name__ = "GTKInterpreterConsole"
 
-    def __init__(self, locals: Dict[str, object], banner=banner):
+    def __init__(
+        self,
+        locals: Dict[str, object],
+        banner=banner,
+        run_context: Callable[[], ContextManager] = contextlib.nullcontext,
+    ):
         Gtk.ScrolledWindow.__init__(self)
         self.locals = dict(locals)
+        self.run_context = run_context
 
         self.set_min_content_width(640)
         self.set_min_content_height(480)
@@ -206,7 +215,7 @@ class GTKInterpreterConsole(Gtk.ScrolledWindow):
 
         source = "\n".join(self.buffer)
 
-        with self.stdout, self.stderr:
+        with self.stdout, self.stderr, self.run_context():
             more = self.interpreter.runsource(source, "<<console>>")
 
         if not more:
@@ -70,7 +70,8 @@ class ConsoleWindow(UIComponent, ActionProvider):
             locals={
                 "service": self.component_registry.get_service,
                 "select": element_factory.lselect,
-            }
+            },
+            run_context=element_factory.update_batch,
         )
         if Gtk.get_major_version() == 3:
             console.show()
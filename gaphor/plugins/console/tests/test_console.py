@@ -1,3 +1,5 @@
+from contextlib import contextmanager
+
 from gi.repository import Gdk, GLib
 
 from gaphor.plugins.console.console import GTKInterpreterConsole, Help, main
@@ -82,3 +84,19 @@ def test_run_line():
     text = console_text(console)
 
     assert "Usage: help(object)" in text
+
+
+def test_source_is_run_in_run_context():
+    log = []
+
+    @contextmanager
+    def run_context():
+        log.append("enter")
+        yield
+        log.append("exit")
+
+    console = GTKInterpreterConsole(locals={"log": log}, run_context=run_context)
+
+    console.push("log.append('run')")
+
+    assert log == ["enter", "run", "exit"]
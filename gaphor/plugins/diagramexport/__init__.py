@@ -17,15 +17,20 @@ from gaphor.ui.questiondialog import QuestionDialog
 logger = logging.getLogger(__name__)
 
 
-def new_painter(diagram):
+def new_painter(diagram, item_painter=None):
     style = diagram.style(StyledDiagram(diagram))
 
     sloppiness = style.get("line-style", 0.0)
+    item_painter = item_painter or ItemPainter()
 
     if sloppiness:
-        return FreeHandPainter(ItemPainter(), sloppiness)
+        return FreeHandPainter(item_painter, sloppiness)
     else:
-        return ItemPainter()
+        return item_painter
+
+
+def measure_context():
+    return cairo.Context(cairo.ImageSurface(cairo.FORMAT_ARGB32, 0, 0))
 
 
 class DiagramExport(Service, ActionProvider):
@@ -54,27 +59,26 @@ class DiagramExport(Service, ActionProvider):
         )
 
     def render(self, diagram, new_surface):
-        diagram.update_now(diagram.get_all_items())
-
         painter = new_painter(diagram)
+        bounding_box = self.prepare(diagram, painter, measure_context())
+        surface = new_surface(bounding_box.width, bounding_box.height)
+        self.paint(diagram, painter, bounding_box, surface)
+        return surface
 
-        # Update bounding boxes with a temporary CairoContext
-        # (used for stuff like calculating font metrics)
-        tmpsurface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 0, 0)
-        tmpcr = cairo.Context(tmpsurface)
-        bounding_box = BoundingBoxPainter(painter).bounding_box(
-            diagram.get_all_items(), tmpcr
-        )
-        tmpcr.show_page()
-        tmpsurface.flush()
+    def prepare(self, diagram, painter, cr):
+        """Update a diagram, and return its bounding box.
+
+        The context ``cr`` is used for stuff like calculating font
+        metrics. It can be reused for many diagrams.
+        """
+        diagram.update_now(diagram.get_all_items())
+        return BoundingBoxPainter(painter).bounding_box(diagram.get_all_items(), cr)
 
-        w, h = bounding_box.width, bounding_box.height
-        surface = new_surface(w, h)
+    def paint(self, diagram, painter, bounding_box, surface):
         cr = cairo.Context(surface)
         cr.translate(-bounding_box.x, -bounding_box.y)
         painter.paint(items=diagram.get_all_items(), cairo=cr)
         cr.show_page()
-        return surface
 
     def save_svg(self, filename, diagram):
         surface = self.render(diagram, lambda w, h: cairo.SVGSurface(filename, w, h))
@@ -95,6 +99,28 @@ class DiagramExport(Service, ActionProvider):
         surface.flush()
         surface.finish()
 
+    def save_pdfs(self, filename, diagrams):
+        """Export diagrams to one PDF file, one diagram per page.
+
+        The diagrams can be any iterable, e.g. a generator. Pages are
+        written to the file as soon as they're painted, so large models
+        can be exported without keeping all pages in memory.
+        """
+        surface = cairo.PDFSurface(filename, 1, 1)
+        item_painter = ItemPainter()
+        cr = measure_context()
+        try:
+            for diagram in diagrams:
+                painter = new_painter(diagram, item_painter)
+                bounding_box = self.prepare(diagram, painter, cr)
+                # A page should have a size
+                surface.set_size(
+                    max(bounding_box.width, 1), max(bounding_box.height, 1)
+                )
+                self.paint(diagram, painter, bounding_box, surface)
+        finally:
+            surface.finish()
+
     @action(
         name="file-export-svg",
         label=gettext("Export to SVG"),
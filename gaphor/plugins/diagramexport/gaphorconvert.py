@@ -1,14 +1,29 @@
 #!/usr/bin/python
 
+import hashlib
+import json
+import multiprocessing
 import optparse
 import os
 import re
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from typing import List
 
+from gaphor import UML, application
 from gaphor.application import Session
-from gaphor.core.modeling import Diagram
-from gaphor.storage import storage
+from gaphor.core.modeling import Diagram, Element
+from gaphor.core.modeling.collection import collection
+from gaphor.storage import parser, storage
+
+SERVICES = [
+    "event_manager",
+    "component_registry",
+    "element_factory",
+    "element_dispatcher",
+    "modeling_language",
+    "diagram_export",
+]
 
 
 def pkg2dir(package):
@@ -48,6 +63,29 @@ def parse_options(argv):
         default="pdf",
         choices=["pdf", "svg", "png"],
     )
+    parser.add_option(
+        "-j",
+        "--jobs",
+        dest="jobs",
+        metavar="N",
+        type="int",
+        default=1,
+        help="render diagrams in N parallel processes, default 1",
+    )
+    parser.add_option(
+        "--incremental",
+        dest="incremental",
+        action="store_true",
+        help="only render diagrams that changed since the previous run;"
+        " content hashes are kept in the output directory",
+    )
+    parser.add_option(
+        "--single-pdf",
+        dest="single_pdf",
+        action="store_true",
+        help="export all diagrams of a model to one PDF file, one diagram per page;"
+        " the file is named after the model",
+    )
     parser.add_option(
         "-r",
         "--regex",
@@ -59,6 +97,16 @@ def parse_options(argv):
 
     options, args = parser.parse_args(argv)
 
+    if options.single_pdf:
+        if options.format != "pdf":
+            parser.error("option --single-pdf can only export to pdf")
+        if options.jobs != 1:
+            parser.error("options --single-pdf and --jobs are mutually exclusive")
+        if options.incremental:
+            parser.error(
+                "options --single-pdf and --incremental are mutually exclusive"
+            )
+
     if not args:
         parser.print_help()
 
@@ -73,16 +121,7 @@ def main(argv=sys.argv[1:]):
         if options.verbose:
             print(msg, file=sys.stderr)
 
-    session = Session(
-        services=[
-            "event_manager",
-            "component_registry",
-            "element_factory",
-            "element_dispatcher",
-            "modeling_language",
-            "diagram_export",
-        ]
-    )
+    session = Session(services=SERVICES)
     factory = session.get_service("element_factory")
     modeling_language = session.get_service("modeling_language")
     diagram_export = session.get_service("diagram_export")
@@ -91,44 +130,413 @@ def main(argv=sys.argv[1:]):
     if options.regex:
         name_re = re.compile(options.regex, re.I)
 
+    if options.single_pdf:
+        return convert_single_pdf(
+            options, args, factory, modeling_language, diagram_export, name_re, message
+        )
+
+    if options.jobs > 1:
+        return convert_parallel(options, args, name_re, message)
+
+    manifest = Manifest(options.dir) if options.incremental else None
+
     # we should have some gaphor files to be processed at this point
+    status = 0
+    try:
+        for model in args:
+            message(f"loading model {model}")
+            try:
+                storage.load(model, factory, modeling_language)
+            except Exception as e:
+                status = failed(f"failed to load {model}", e)
+                continue
+            message("ready for rendering")
+
+            for diagram, pname, outfilename in diagrams_to_render(
+                loaded_diagrams(factory), options, name_re, message
+            ):
+                if manifest:
+                    digest = diagram_digest(diagram)
+                    if manifest.unchanged(outfilename, digest):
+                        message(f"unchanged: {pname}")
+                        continue
+                message(f"rendering: {pname} -> {outfilename}...")
+                try:
+                    render(diagram_export, diagram, outfilename, options.format)
+                except Exception as e:
+                    status = failed(f"failed to render {outfilename}", e)
+                    continue
+                if manifest:
+                    manifest.record(outfilename, digest)
+    finally:
+        if manifest:
+            manifest.save()
+
+    return status
+
+
+def failed(msg, error):
+    """Report an error and return the exit status for it.
+
+    Conversion continues with the next diagram or model, so all errors
+    are reported in one run.
+    """
+    print(f"{msg}: {str(error) or type(error).__name__}", file=sys.stderr)
+    return 1
+
+
+def loaded_diagrams(factory):
+    """Iterate (diagram, owner directory, name) for the loaded model."""
+    for diagram in factory.select(Diagram):
+        yield diagram, pkg2dir(diagram.owner), diagram.name
+
+
+def parsed_diagrams(model):
+    """Iterate (diagram id, owner directory, name) for a model file.
+
+    The model is only parsed, not loaded, so this is a lot cheaper than
+    ``loaded_diagrams()``. Diagrams are listed in the same order.
+    """
+    loader = parser.GaphorLoader()
+    for _ in parser.parse_generator(model, loader):
+        pass
+    elements = loader.elements
+    gaphor_version = loader.gaphor_version
+
+    def owner_dir(id):
+        name: List[str] = []
+        while id in elements:
+            elem = elements[id]
+            name.insert(0, elem.values.get("name"))
+            id = elem.references.get("package")
+        return "/".join(name)
+
+    for elem in elements.values():
+        if elem.type == "Diagram":
+            elem = storage.upgrade_element(elem, gaphor_version)
+            odir = owner_dir(elem.references.get("element"))
+            yield elem.id, odir, elem.values.get("name")
+
+
+def selected_diagrams(diagrams, options, name_re, message):
+    """Iterate (diagram, full name, directory, name) for the diagrams that
+    match the regular expression.
+
+    ``diagrams`` iterates (diagram, owner directory, name), see
+    ``loaded_diagrams()`` and ``parsed_diagrams()``.
+    """
+    for diagram, odir, dname in diagrams:
+        # full diagram name including package path
+        pname = f"{odir}/{dname}"
+
+        if options.underscores:
+            odir = odir.replace(" ", "_")
+            dname = dname.replace(" ", "_")
+
+        if name_re and not name_re.search(pname):
+            message(f"skipping {pname}")
+            continue
+
+        yield diagram, pname, odir, dname
+
+
+def diagrams_to_render(diagrams, options, name_re, message):
+    """Iterate (diagram, full name, output filename) for the selected
+    diagrams.
+
+    Output directories are created along the way.
+    """
+    for diagram, pname, odir, dname in selected_diagrams(
+        diagrams, options, name_re, message
+    ):
+        if options.dir:
+            odir = f"{options.dir}/{odir}"
+
+        outfilename = f"{odir}/{dname}.{options.format}"
+
+        if not os.path.exists(odir):
+            message(f"creating dir {odir}")
+            os.makedirs(odir)
+
+        yield diagram, pname, outfilename
+
+
+def convert_single_pdf(
+    options, args, factory, modeling_language, diagram_export, name_re, message
+):
+    """Export the diagrams of each model to a single PDF file.
+
+    The file is named after the model file. Diagrams are rendered one at
+    a time, and written to the file as soon as they're rendered.
+    """
+    odir = options.dir or os.curdir
+    if not os.path.exists(odir):
+        message(f"creating dir {odir}")
+        os.makedirs(odir)
+
+    status = 0
     for model in args:
         message(f"loading model {model}")
-        storage.load(model, factory, modeling_language)
+        try:
+            storage.load(model, factory, modeling_language)
+        except Exception as e:
+            status = failed(f"failed to load {model}", e)
+            continue
         message("ready for rendering")
 
-        for diagram in factory.select(Diagram):
-            odir = pkg2dir(diagram.owner)
+        name = os.path.splitext(os.path.basename(model))[0]
+        if options.underscores:
+            name = name.replace(" ", "_")
+        outfilename = os.path.join(odir, f"{name}.pdf")
+
+        def diagrams():
+            for diagram, pname, _, _ in selected_diagrams(
+                loaded_diagrams(factory), options, name_re, message
+            ):
+                message(f"rendering: {pname} -> {outfilename}...")
+                yield diagram
+
+        try:
+            diagram_export.save_pdfs(outfilename, diagrams())
+        except Exception as e:
+            status = failed(f"failed to render {outfilename}", e)
+    return status
+
+
+def render(diagram_export, diagram, outfilename, format):
+    if format == "pdf":
+        diagram_export.save_pdf(outfilename, diagram)
+    elif format == "svg":
+        diagram_export.save_svg(outfilename, diagram)
+    elif format == "png":
+        diagram_export.save_png(outfilename, diagram)
+    else:
+        raise RuntimeError(f"Unknown file format: {format}")
+
+
+class Manifest:
+    """Content hashes of the diagrams rendered in an output directory.
+
+    The manifest is stored as a JSON file, mapping output files
+    (relative to the output directory) to the digest of the diagram
+    that was rendered to them.
+    """
+
+    filename = ".gaphorconvert-manifest.json"
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.curdir
+        self.path = os.path.join(self.directory, self.filename)
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.digests = json.load(f)
+        except (OSError, ValueError):
+            self.digests = {}
+
+    def _key(self, outfilename):
+        return os.path.relpath(outfilename, self.directory)
+
+    def digest(self, outfilename):
+        """The digest of the diagram last rendered to an output file."""
+        return self.digests.get(self._key(outfilename))
+
+    def unchanged(self, outfilename, digest):
+        """The output file exists and was rendered from a diagram with the
+        same digest."""
+        return unchanged(outfilename, digest, self.digest(outfilename))
+
+    def record(self, outfilename, digest):
+        self.digests[self._key(outfilename)] = digest
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.digests, f, indent=1, sort_keys=True)
+
+
+def unchanged(outfilename, digest, previous_digest):
+    return digest == previous_digest and os.path.exists(outfilename)
 
-            # just diagram name
-            dname = diagram.name
-            # full diagram name including package path
-            pname = f"{odir}/{dname}"
 
-            if options.underscores:
-                odir = odir.replace(" ", "_")
-                dname = dname.replace(" ", "_")
+def displayed_features(element):
+    """Iterate the elements shown as part of a model element's
+    presentation item: attributes, operations, parameters, literals,
+    association ends, applied stereotypes and their slots."""
+    if isinstance(element, UML.InstanceSpecification):
+        yield from element.slot
+    for name in (
+        "ownedAttribute",
+        "ownedOperation",
+        "ownedParameter",
+        "ownedLiteral",
+        "memberEnd",
+        "appliedStereotype",
+    ):
+        yield from getattr(element, name, ())
 
-            if name_re and not name_re.search(pname):
-                message(f"skipping {pname}")
+
+def rendered_elements(diagram):
+    """Iterate the model elements shown on a diagram.
+
+    Those are the subjects of the presentation items and their displayed
+    features. Other owned elements, such as the contents of a package,
+    are left out: they are only shown by presentation items of their
+    own.
+    """
+    seen = set()
+    stack = [item.subject for item in diagram.get_all_items() if item.subject]
+    stack.reverse()
+    while stack:
+        element = stack.pop()
+        if element in seen:
+            continue
+        seen.add(element)
+        yield element
+        features = list(displayed_features(element))
+        features.reverse()
+        stack.extend(features)
+
+
+def diagram_digest(diagram):
+    """A hash of everything that determines how a diagram is rendered.
+
+    The digest covers the Gaphor version, the style sheet, the diagram
+    and its presentation items and the model elements they show.
+    References are included by id and name, so renaming e.g. the type of
+    an attribute changes the digest as well.
+    """
+    digest = hashlib.sha256()
+
+    def update(*values):
+        digest.update("\0".join(values).encode("utf-8"))
+        digest.update(b"\n")
+
+    def reference(element):
+        return element.id, getattr(element, "name", None) or ""
+
+    def save_func(name, value):
+        if isinstance(value, Element):
+            update(name, *reference(value))
+        elif isinstance(value, collection):
+            update(name, *(v for element in value for v in reference(element)))
+        else:
+            update(name, str(value))
+
+    def update_element(element):
+        update(type(element).__name__, element.id)
+        element.save(save_func)
+
+    update(application.distribution().version)
+    style_sheet = diagram.styleSheet
+    update(style_sheet.styleSheet if style_sheet else "")
+    update_element(diagram)
+    for item in diagram.get_all_items():
+        update_element(item)
+    for element in rendered_elements(diagram):
+        update_element(element)
+    return digest.hexdigest()
+
+
+def convert_parallel(options, args, name_re, message):
+    """Render diagrams of all models in a pool of worker processes.
+
+    The models are only parsed to determine the diagrams to render, so
+    output paths are the same as for a sequential run. Each (model,
+    diagram) pair is rendered by a worker. With ``--incremental``, the
+    worker checks if the diagram changed before rendering it.
+    """
+    manifest = Manifest(options.dir) if options.incremental else None
+
+    # Keyed by output file: if two diagrams map to the same file, the
+    # last one wins, like in a sequential run.
+    tasks = {}
+    status = 0
+    for model in args:
+        message(f"reading diagrams from {model}")
+        try:
+            diagrams = list(parsed_diagrams(model))
+        except Exception as e:
+            status = failed(f"failed to load {model}", e)
+            continue
+        for diagram_id, pname, outfilename in diagrams_to_render(
+            diagrams, options, name_re, message
+        ):
+            tasks.pop(outfilename, None)
+            tasks[outfilename] = (
+                model,
+                diagram_id,
+                pname,
+                outfilename,
+                options.format,
+                manifest and manifest.digest(outfilename),
+            )
+
+    # Keep diagrams of the same model together, so workers do not have
+    # to reload models too often.
+    work = sorted(tasks.values(), key=lambda task: args.index(task[0]))
+    chunksize = max(1, len(work) // (options.jobs * 4))
+
+    with ProcessPoolExecutor(
+        max_workers=options.jobs,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(bool(manifest),),
+    ) as executor:
+        for (_, _, pname, outfilename, _, _), (digest, rendered, error) in zip(
+            work, executor.map(_render_task, work, chunksize=chunksize)
+        ):
+            if error:
+                status = failed(f"failed to render {outfilename}", error)
                 continue
+            message(
+                f"rendered: {pname} -> {outfilename}"
+                if rendered
+                else f"unchanged: {pname}"
+            )
+            if manifest:
+                manifest.record(outfilename, digest)
+    if manifest:
+        manifest.save()
+    return status
+
+
+_worker_session = None
+_worker_model = None
+_worker_incremental = False
 
-            if options.dir:
-                odir = f"{options.dir}/{odir}"
 
-            outfilename = f"{odir}/{dname}.{options.format}"
+def _init_worker(incremental):
+    global _worker_session, _worker_incremental
+    _worker_session = Session(services=SERVICES)
+    _worker_incremental = incremental
 
-            if not os.path.exists(odir):
-                message(f"creating dir {odir}")
-                os.makedirs(odir)
 
-            message(f"rendering: {pname} -> {outfilename}...")
+def _render_task(task):
+    """Render one diagram in a worker process.
 
-            if options.format == "pdf":
-                diagram_export.save_pdf(outfilename, diagram)
-            elif options.format == "svg":
-                diagram_export.save_svg(outfilename, diagram)
-            elif options.format == "png":
-                diagram_export.save_png(outfilename, diagram)
-            else:
-                raise RuntimeError(f"Unknown file format: {options.format}")
+    Returns the digest of the diagram (if ``--incremental`` is used),
+    whether it was rendered and an error message, or None if no error
+    occurred.
+    """
+    global _worker_model
+    model, diagram_id, _, outfilename, format, previous_digest = task
+    factory = _worker_session.get_service("element_factory")
+    digest = None
+    try:
+        if model != _worker_model:
+            _worker_model = None
+            storage.load(
+                model, factory, _worker_session.get_service("modeling_language")
+            )
+            _worker_model = model
+        diagram = factory.lookup(diagram_id)
+        if _worker_incremental:
+            digest = diagram_digest(diagram)
+            if unchanged(outfilename, digest, previous_digest):
+                return digest, False, None
+        render(
+            _worker_session.get_service("diagram_export"), diagram, outfilename, format
+        )
+    except Exception as e:
+        return digest, False, str(e) or type(e).__name__
+    return digest, True, None
@@ -1,5 +1,9 @@
+import re
+import zlib
+
 import pytest
 
+from gaphor.core.modeling import Diagram
 from gaphor.diagram.general import Box
 from gaphor.plugins.diagramexport import DiagramExport
 
@@ -40,3 +44,66 @@ def test_export_to_pdf(diagram_export, diagram_with_box, tmp_path):
     content = f.read_bytes()
 
     assert b"%PDF" in content
+
+
+def pdf_pages(path):
+    """The number of pages and the page sizes, in order, of a PDF file.
+
+    Cairo can store page objects in compressed object streams, so streams
+    are searched after they are decompressed.
+    """
+    content = path.read_bytes()
+    data = [content]
+    for stream in re.findall(rb"stream\r?\n(.*?)endstream", content, re.S):
+        try:
+            data.append(zlib.decompressobj().decompress(stream))
+        except zlib.error:
+            pass
+    objects = b"\n".join(data)
+
+    count = re.search(rb"/Type\s*/Pages\b.*?/Count\s+(\d+)", objects, re.S)
+    sizes = re.findall(
+        rb"/Type\s*/Page\b[^>]*?/MediaBox\s*\[\s*([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s+([-\d.]+)\s*\]",
+        objects,
+    )
+    return int(count.group(1)), [
+        (float(x1) - float(x0), float(y1) - float(y0)) for x0, y0, x1, y1 in sizes
+    ]
+
+
+def test_export_diagrams_to_single_pdf(
+    diagram_export, diagram, element_factory, tmp_path
+):
+    f = tmp_path / "test.pdf"
+    wide = diagram.create(Box)
+    wide.width, wide.height = 300, 20
+    empty_diagram = element_factory.create(Diagram)
+    tall_diagram = element_factory.create(Diagram)
+    tall = tall_diagram.create(Box)
+    tall.width, tall.height = 20, 300
+
+    diagram_export.save_pdfs(f, iter([diagram, empty_diagram, tall_diagram]))
+    count, sizes = pdf_pages(f)
+
+    assert count == 3
+    assert len(sizes) == 3
+    (wide_width, wide_height), empty_size, (tall_width, tall_height) = sizes
+    assert wide_width >= 300 > wide_height
+    assert empty_size == (1, 1)
+    assert tall_height >= 300 > tall_width
+
+
+def test_export_empty_diagram_to_single_pdf(diagram_export, diagram, tmp_path):
+    f = tmp_path / "test.pdf"
+
+    diagram_export.save_pdfs(f, [diagram])
+
+    assert pdf_pages(f) == (1, [(1, 1)])
+
+
+def test_export_no_diagrams_to_single_pdf(diagram_export, tmp_path):
+    f = tmp_path / "test.pdf"
+
+    diagram_export.save_pdfs(f, [])
+
+    assert f.read_bytes().startswith(b"%PDF")
@@ -61,7 +61,7 @@ class CopyService(Service, ActionProvider):
 
     def paste(self, diagram):
         """Paste items in the copy-buffer to the diagram."""
-        with Transaction(self.event_manager):
+        with Transaction(self.event_manager), self.element_factory.update_batch():
             # Create new id's that have to be used to create the items:
             new_items: Set[Presentation] = paste(
                 copy_buffer, diagram, self.element_factory.lookup
@@ -1,6 +1,8 @@
 """Test the UndoManager."""
 import pytest
 
+import gaphor.services.undomanager
+from gaphor import UML
 from gaphor.core import event_handler
 from gaphor.core.modeling import Element
 from gaphor.core.modeling.event import AssociationUpdated
@@ -429,3 +431,143 @@ def test_redo_stack(event_manager, element_factory, undo_manager):
     assert element_factory.size() == 2
 
     assert element_factory.lookup(p.id)
+
+
+def test_undo_actions_are_executed_in_phases(
+    event_manager, element_factory, undo_manager
+):
+    with Transaction(event_manager):
+        package = element_factory.create(UML.Package)
+        klass = element_factory.create(UML.Class)
+        klass.package = package
+        klass.name = "Foo"
+
+    with Transaction(event_manager):
+        klass.unlink()
+
+    undo_manager.undo_transaction()
+
+    klass = element_factory.lookup(klass.id)
+    assert klass.package is package
+    assert klass.name == "Foo"
+    assert klass in package.ownedType
+
+
+@pytest.mark.slow
+def test_bulk_delete_undo_performance(event_manager, element_factory, undo_manager):
+    with Transaction(event_manager):
+        package = element_factory.create(UML.Package)
+        for n in range(2_000):
+            klass = element_factory.create(UML.Class)
+            klass.name = f"Class{n}"
+            klass.package = package
+            klass.ownedAttribute = element_factory.create(UML.Property)
+
+    size = element_factory.size()
+
+    with Transaction(event_manager):
+        for klass in element_factory.lselect(UML.Class):
+            klass.unlink()
+
+    undo_manager.undo_transaction()
+
+    assert element_factory.size() == size
+    assert len(package.ownedType) == 2_000
+
+    undo_manager.redo_transaction()
+
+    assert element_factory.size() == 1
+
+
+def create_classes(event_manager, element_factory, count):
+    classes = []
+    for n in range(count):
+        with Transaction(event_manager):
+            klass = element_factory.create(UML.Class)
+            klass.name = f"Class{n}"
+        classes.append(klass)
+    return classes
+
+
+def test_undo_history_is_bounded_by_budget(
+    event_manager, element_factory, undo_manager
+):
+    undo_manager.undo_budget = 5
+    create_classes(event_manager, element_factory, 4)
+
+    assert sum(tx.size for tx in undo_manager._undo_stack) <= 5
+    assert len(undo_manager._undo_stack) == 2
+
+
+def test_latest_transaction_is_kept_if_it_exceeds_budget(
+    event_manager, element_factory, undo_manager
+):
+    undo_manager.undo_budget = 1
+    create_classes(event_manager, element_factory, 2)
+
+    assert len(undo_manager._undo_stack) == 1
+
+    undo_manager.undo_transaction()
+
+    assert element_factory.size() == 1
+
+
+def test_spill_undo_history(
+    event_manager, element_factory, undo_manager, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(
+        gaphor.services.undomanager, "get_cache_dir", lambda: str(tmp_path)
+    )
+    undo_manager.undo_budget = 5
+    undo_manager.spill_undo_history = True
+    classes = create_classes(event_manager, element_factory, 4)
+
+    with Transaction(event_manager):
+        classes[0].name = "Renamed"
+
+    assert len(undo_manager._undo_stack) == 5
+    assert [tx.spilled for tx in undo_manager._undo_stack] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+    undo_manager.undo_transaction()
+    while undo_manager.can_undo():
+        undo_manager.undo_transaction()
+
+    assert element_factory.size() == 0
+
+    while undo_manager.can_redo():
+        undo_manager.redo_transaction()
+
+    assert [c.name for c in element_factory.select(UML.Class)] == [
+        "Renamed",
+        "Class1",
+        "Class2",
+        "Class3",
+    ]
+
+
+def test_transactions_that_can_not_be_spilled_are_evicted(
+    event_manager, element_factory, undo_manager, monkeypatch, tmp_path
+):
+    monkeypatch.setattr(
+        gaphor.services.undomanager, "get_cache_dir", lambda: str(tmp_path)
+    )
+    undo_manager.undo_budget = 2
+    undo_manager.spill_undo_history = True
+    create_classes(event_manager, element_factory, 2)
+
+    with Transaction(event_manager):
+        undo_manager.add_undo_action(lambda: None)
+    create_classes(event_manager, element_factory, 1)
+
+    assert len(undo_manager._undo_stack) == 1
+
+
+def test_deep_lookup_of_unknown_element(element_factory, undo_manager):
+    with pytest.raises(ValueError):
+        undo_manager.deep_lookup("no-such-id")
@@ -7,11 +7,17 @@ An undo action should be a callable object (called with no arguments).
 An undo action should return a callable object that acts as redo function.
 If None is returned the undo action is considered to be the redo action as well.
 
-NOTE: it would be nice to use actions in conjunction with functools.partial.
+Changes to the model are recorded as compact undo records: a tuple of a
+function and its arguments. Records refer to elements by id.
 """
 
+import io
 import logging
-from typing import Callable, List, Optional
+import pickle
+import tempfile
+import zlib
+from typing import IO, Callable, List, Optional, Tuple, Union
+from weakref import WeakValueDictionary
 
 from gaphor.abc import ActionProvider, Service
 from gaphor.action import action
@@ -30,6 +36,7 @@ from gaphor.core.modeling.event import (
 )
 from gaphor.core.modeling.presentation import Presentation
 from gaphor.core.modeling.properties import association as association_property
+from gaphor.core.modeling.properties import umlproperty
 from gaphor.diagram.copypaste import deserialize, serialize
 from gaphor.event import (
     ActionEnabled,
@@ -38,11 +45,37 @@ from gaphor.event import (
     TransactionCommit,
     TransactionRollback,
 )
+from gaphor.services.properties import get_cache_dir
 from gaphor.transaction import Transaction, transactional
 
 logger = logging.getLogger(__name__)
 
 
+# Undo actions are played back in phases: deleted elements are recreated
+# first, so they can be referred to, and created elements are unlinked last.
+(
+    RECREATE_ELEMENT,
+    RECREATE_PRESENTATION,
+    REVERT_EVENT,
+    REVERT_ASSOCIATION_ADDED,
+    REVERT_ASSOCIATION_DELETED,
+    REVERT_ASSOCIATION_SET,
+    REVERT_ATTRIBUTE,
+    UNLINK_ELEMENT,
+    OTHER_ACTION,
+) = range(9)
+
+# An undo record is a tuple (function, *arguments), or a plain callable
+UndoRecord = Union[Tuple, Callable[[], None]]
+
+
+def execute_record(record: UndoRecord) -> None:
+    if type(record) is tuple:
+        record[0](*record[1:])
+    else:
+        record()
+
+
 class ActionStack:
     """A transaction.
 
@@ -51,24 +84,122 @@ class ActionStack:
     played back when a transaction is executed. This executing a
     transaction has the effect of performing the actions recorded, which
     will typically undo actions performed by the user.
+
+    Actions are kept per phase, in the order they're added. The size of a
+    transaction is the number of actions kept in memory.
     """
 
     def __init__(self):
-        self._actions: List[Callable[[], None]] = []
+        self._phases: Tuple[List[UndoRecord], ...] = tuple(
+            [] for _ in range(OTHER_ACTION + 1)
+        )
+        self.size = 0
+        self._spilled: Optional[Tuple[SpillFile, int, int]] = None
 
-    def add(self, action):
-        self._actions.append(action)
+    @property
+    def _actions(self) -> List[UndoRecord]:
+        return [record for actions in self._load() for record in actions]
+
+    @property
+    def spilled(self):
+        return self._spilled is not None
+
+    def add(self, action, phase=OTHER_ACTION):
+        self._phases[phase].append(action)
+        self.size += 1
 
     def can_execute(self):
-        return self._actions and True or False
+        return self.spilled or any(self._phases)
+
+    def spill(self, spill_file: "SpillFile") -> bool:
+        """Move the actions to a spill file.
+
+        Only model changes can be spilled. Returns ``True`` if the
+        actions are no longer kept in memory.
+        """
+        if self._spilled:
+            return True
+        phases = self._phases
+        if phases[REVERT_EVENT] or phases[OTHER_ACTION]:
+            return False
+        location = spill_file.write(phases)
+        if location is None:
+            return False
+        self._spilled = (spill_file, *location)
+        self._phases = ()
+        self.size = 0
+        return True
+
+    def _load(self):
+        if self._spilled:
+            spill_file, offset, length = self._spilled
+            return spill_file.read(offset, length)
+        return self._phases
 
     @transactional
     def execute(self):
-        self._actions.sort(key=lambda fn: fn.__name__)
+        for actions in self._load():
+            for record in actions:
+                logger.debug("Execute undo action %s", record)
+                execute_record(record)
 
-        for act in self._actions:
-            logger.debug(act.__doc__)
-            act()
+
+class SpillFile:
+    """A compressed temporary file for undo records that are evicted from
+    memory.
+
+    The file is created in the cache directory and is removed when it's
+    closed. Records refer to the undo manager and model properties, those
+    are stored by reference.
+    """
+
+    def __init__(self, undo_manager):
+        self._file: Optional[IO[bytes]] = None
+        self._objects: List[object] = [undo_manager]
+        self._object_ids = {id(undo_manager): 0}
+
+    def _persistent_id(self, obj):
+        if isinstance(obj, umlproperty) or obj is self._objects[0]:
+            try:
+                return self._object_ids[id(obj)]
+            except KeyError:
+                index = self._object_ids[id(obj)] = len(self._objects)
+                self._objects.append(obj)
+                return index
+        return None
+
+    def write(self, data) -> Optional[Tuple[int, int]]:
+        """Write data, return the location (offset and length), or ``None``
+        if the data can not be stored."""
+        try:
+            buffer = io.BytesIO()
+            pickler = pickle.Pickler(buffer, pickle.HIGHEST_PROTOCOL)
+            pickler.persistent_id = self._persistent_id  # type: ignore[assignment]
+            pickler.dump(data)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            logger.debug("Undo records can not be spilled", exc_info=True)
+            return None
+
+        data = zlib.compress(buffer.getbuffer(), 1)
+        if not self._file:
+            self._file = tempfile.TemporaryFile(prefix="undo-", dir=get_cache_dir())
+        offset = self._file.seek(0, io.SEEK_END)
+        self._file.write(data)
+        return offset, len(data)
+
+    def read(self, offset, length):
+        assert self._file
+        self._file.seek(offset)
+        unpickler = pickle.Unpickler(
+            io.BytesIO(zlib.decompress(self._file.read(length)))
+        )
+        unpickler.persistent_load = self._objects.__getitem__  # type: ignore[assignment]
+        return unpickler.load()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
 
 
 class UndoManagerStateChanged(ServiceEvent):
@@ -88,6 +219,11 @@ class UndoManager(Service, ActionProvider):
     (e.i action()) If something is returned by an action, that is
     considered the callable to be used to undo or redo the last
     performed action.
+
+    The stacks hold at most ``undo_budget`` actions in memory. If the
+    budget is exceeded, the oldest transactions are evicted. With
+    ``spill_undo_history`` set, they are moved to a temporary file
+    instead, if possible.
     """
 
     def __init__(self, event_manager, element_factory):
@@ -98,6 +234,11 @@ class UndoManager(Service, ActionProvider):
         self._stack_depth = 20
         self._current_transaction = None
         self._undoing = 0
+        self.undo_budget: Optional[int] = 100_000
+        self.spill_undo_history = False
+        self._spill_file: Optional[SpillFile] = None
+        # Elements in the undo log that are not in the element factory
+        self._unregistered: WeakValueDictionary[str, Element] = WeakValueDictionary()
 
         event_manager.subscribe(self.reset)
         event_manager.subscribe(self.begin_transaction)
@@ -112,6 +253,12 @@ class UndoManager(Service, ActionProvider):
         self.event_manager.unsubscribe(self.commit_transaction)
         self.event_manager.unsubscribe(self.rollback_transaction)
         self._unregister_undo_handlers()
+        self._close_spill_file()
+
+    def _close_spill_file(self):
+        if self._spill_file:
+            self._spill_file.close()
+            self._spill_file = None
 
     def clear_undo_stack(self):
         self._undo_stack = []
@@ -124,6 +271,7 @@ class UndoManager(Service, ActionProvider):
     def reset(self, event=None):
         self.clear_redo_stack()
         self.clear_undo_stack()
+        self._close_spill_file()
         self._action_executed()
 
     @event_handler(TransactionBegin)
@@ -134,16 +282,23 @@ class UndoManager(Service, ActionProvider):
 
     def add_undo_action(self, action, requires_transaction=True):
         """Add an action to undo."""
-        if self._current_transaction:
-            self._current_transaction.add(action)
-            self._action_executed()
+        self._add_undo_record(OTHER_ACTION, action, requires_transaction)
+
+    def _add_undo_record(self, phase, record, requires_transaction=True):
+        transaction = self._current_transaction
+        if transaction:
+            # Undo state only changes with the first action
+            first = not transaction.can_execute()
+            transaction.add(record, phase)
+            if first:
+                self._action_executed()
         elif requires_transaction:
             undo_stack = list(self._undo_stack)
             redo_stack = list(self._redo_stack)
 
             try:
                 with Transaction(self.event_manager):
-                    action()
+                    execute_record(record)
             finally:
                 # Restore stacks and act like nothing happened
                 self._redo_stack = redo_stack
@@ -158,8 +313,7 @@ class UndoManager(Service, ActionProvider):
         if self._current_transaction.can_execute():
             self.clear_redo_stack()
             self._undo_stack.append(self._current_transaction)
-            while len(self._undo_stack) > self._stack_depth:
-                del self._undo_stack[0]
+            self._trim_stacks()
 
         self._current_transaction = None
 
@@ -210,7 +364,7 @@ class UndoManager(Service, ActionProvider):
 
         try:
             self._undoing += 1
-            with Transaction(self.event_manager):
+            with Transaction(self.event_manager), self.element_factory.update_batch():
                 transaction.execute()
         finally:
             # Restore stacks and put latest tx on the redo stack
@@ -220,8 +374,7 @@ class UndoManager(Service, ActionProvider):
             self._undo_stack = undo_stack
             self._undoing -= 1
 
-        while len(self._redo_stack) > self._stack_depth:
-            del self._redo_stack[0]
+        self._trim_stacks()
 
         self._action_executed()
 
@@ -238,7 +391,7 @@ class UndoManager(Service, ActionProvider):
         redo_stack = list(self._redo_stack)
         try:
             self._undoing += 1
-            with Transaction(self.event_manager):
+            with Transaction(self.event_manager), self.element_factory.update_batch():
                 transaction.execute()
         finally:
             self._redo_stack = redo_stack
@@ -246,6 +399,37 @@ class UndoManager(Service, ActionProvider):
 
         self._action_executed()
 
+    def _trim_stacks(self):
+        """Evict the oldest transactions that exceed the stack depth or the
+        undo budget.
+
+        The latest transaction on each stack is always kept.
+        """
+        for stack in (self._undo_stack, self._redo_stack):
+            del stack[: -self._stack_depth]
+
+        budget = self.undo_budget
+        if budget is None:
+            return
+
+        size = sum(tx.size for tx in self._undo_stack) + sum(
+            tx.size for tx in self._redo_stack
+        )
+        for stack in (self._undo_stack, self._redo_stack):
+            index = 0
+            while size > budget and index < len(stack) - 1:
+                transaction = stack[index]
+                size -= transaction.size
+                if self.spill_undo_history:
+                    if not self._spill_file:
+                        self._spill_file = SpillFile(self)
+                    if transaction.spill(self._spill_file):
+                        index += 1
+                        continue
+                # Older transactions depend on this one
+                del stack[: index + 1]
+                index = 0
+
     def in_transaction(self):
         """The undo manager is recording changes."""
         return self._current_transaction is not None
@@ -268,14 +452,23 @@ class UndoManager(Service, ActionProvider):
     def deep_lookup(self, id: str) -> Element:
         element: Optional[Element] = self.element_factory.lookup(id)
         if not element:
-            for diagram in self.element_factory.select(Diagram):
-                presentation: Element
-                for presentation in diagram.ownedPresentation:
-                    if presentation.id == id:
-                        return presentation
+            element = self._unregistered.get(id)
+        if not element:
             raise ValueError(f"Element with id {id} not found in model")
         return element
 
+    def _ref(self, element: Element) -> str:
+        """The id to find an element by when a record is undone.
+
+        Presentation items can be created without the element factory.
+        Those are remembered here, so they can be found without
+        searching the diagrams.
+        """
+        id = element.id
+        if self.element_factory.lookup(id) is not element:
+            self._unregistered[id] = element
+        return id
+
     #
     # Undo Handlers
     #
@@ -306,140 +499,123 @@ class UndoManager(Service, ActionProvider):
 
     @event_handler(RevertibeEvent)
     def undo_reversible_event(self, event: RevertibeEvent):
-        element_id = event.element.id
-
-        def b_undo_reversible_event():
-            element = self.deep_lookup(element_id)
-            event.revert(element)
-
-        b_undo_reversible_event.__doc__ = (
-            f"Reverse event {event.__class__.__name__} for element {event.element}."
+        self._add_undo_record(
+            REVERT_EVENT,
+            (self._revert_event, self._ref(event.element), event),
+            requires_transaction=event.requires_transaction,
         )
 
-        self.add_undo_action(
-            b_undo_reversible_event, requires_transaction=event.requires_transaction
-        )
+    def _revert_event(self, element_id, event):
+        event.revert(self.deep_lookup(element_id))
 
     @event_handler(ElementCreated)
     def undo_create_element_event(self, event: ElementCreated):
-        element_id = event.element.id
-
-        def d_undo_create_event():
-            element = self.deep_lookup(element_id)
-            element.unlink()
+        self._add_undo_record(UNLINK_ELEMENT, (self._unlink, self._ref(event.element)))
 
-        d_undo_create_event.__doc__ = f"Undo create element {event.element}."
-        del event
-
-        self.add_undo_action(d_undo_create_event)
+    def _unlink(self, element_id):
+        self.deep_lookup(element_id).unlink()
 
     @event_handler(ElementDeleted)
     def undo_delete_element_event(self, event: ElementDeleted):
-        element_type = type(event.element)
-        element_id = event.element.id
-
-        if isinstance(event.element, Presentation):
-            diagram_id = event.diagram.id
-            data = {}
+        element = event.element
+        if isinstance(element, Presentation):
+            data = []
 
             def save_func(name, value):
-                data[name] = serialize(value)
-
-            event.element.save(save_func)
-
-            def b_undo_delete_event():
-                diagram: Diagram = self.deep_lookup(diagram_id)  # type: ignore[assignment]
-                element = diagram.create_as(element_type, element_id)
-                for name, ser in data.items():
-                    for value in deserialize(ser, lambda ref: None):
-                        element.load(name, value)
-
-            undo_delete_event = b_undo_delete_event
+                data.append((name, serialize(value)))
+
+            element.save(save_func)
+            self._add_undo_record(
+                RECREATE_PRESENTATION,
+                (
+                    self._recreate_presentation,
+                    type(element),
+                    element.id,
+                    event.diagram.id,
+                    tuple(data),
+                ),
+            )
         else:
+            self._add_undo_record(
+                RECREATE_ELEMENT, (self._recreate_element, type(element), element.id)
+            )
 
-            def a_undo_delete_event():
-                self.element_factory.create_as(element_type, element_id)
+    def _recreate_presentation(self, element_type, element_id, diagram_id, data):
+        diagram: Diagram = self.deep_lookup(diagram_id)  # type: ignore[assignment]
+        element = diagram.create_as(element_type, element_id)
+        for name, ser in data:
+            for value in deserialize(ser, lambda ref: None):
+                element.load(name, value)
 
-            undo_delete_event = a_undo_delete_event
-
-        undo_delete_event.__doc__ = f"Recreate element {element_type} ({element_id})."
-        del event
-
-        self.add_undo_action(undo_delete_event)
+    def _recreate_element(self, element_type, element_id):
+        self.element_factory.create_as(element_type, element_id)
 
     @event_handler(AttributeUpdated)
     def undo_attribute_change_event(self, event: AttributeUpdated):
-        attribute = event.property
-        element_id = event.element.id
-        value = event.old_value
-
-        def c_undo_attribute_change_event():
-            element = self.deep_lookup(element_id)
-            attribute._set(element, value)
-
-        c_undo_attribute_change_event.__doc__ = (
-            f"Revert {event.element}.{attribute.name} to {value}."
+        self._add_undo_record(
+            REVERT_ATTRIBUTE,
+            (
+                self._set_attribute,
+                self._ref(event.element),
+                event.property,
+                event.old_value,
+            ),
         )
-        del event
 
-        self.add_undo_action(c_undo_attribute_change_event)
+    def _set_attribute(self, element_id, attribute, value):
+        attribute._set(self.deep_lookup(element_id), value)
 
     @event_handler(AssociationSet)
     def undo_association_set_event(self, event: AssociationSet):
         association = event.property
         if type(association) is not association_property:
             return
-        element_id = event.element.id
-        value_id = event.old_value and event.old_value.id
-
-        def c_undo_association_set_event():
-            element = self.deep_lookup(element_id)
-            value = value_id and self.deep_lookup(value_id)
-            association._set(element, value, from_opposite=True)
-
-        c_undo_association_set_event.__doc__ = (
-            f"Revert {event.element}.{association.name} to {event.old_value}."
+        self._add_undo_record(
+            REVERT_ASSOCIATION_SET,
+            (
+                self._set_association,
+                self._ref(event.element),
+                association,
+                event.old_value and self._ref(event.old_value),
+            ),
         )
-        del event
-
-        self.add_undo_action(c_undo_association_set_event)
 
     @event_handler(AssociationAdded)
     def undo_association_add_event(self, event: AssociationAdded):
         association = event.property
         if type(association) is not association_property:
             return
-        element_id = event.element.id
-        value_id = event.new_value.id
-
-        def c_undo_association_add_event():
-            element = self.deep_lookup(element_id)
-            value = self.deep_lookup(value_id)
-            association._del(element, value, from_opposite=True)
-
-        c_undo_association_add_event.__doc__ = (
-            f"{event.element}.{association.name} delete {event.new_value}."
+        self._add_undo_record(
+            REVERT_ASSOCIATION_ADDED,
+            (
+                self._del_association,
+                self._ref(event.element),
+                association,
+                self._ref(event.new_value),
+            ),
         )
-        del event
-
-        self.add_undo_action(c_undo_association_add_event)
 
     @event_handler(AssociationDeleted)
     def undo_association_delete_event(self, event: AssociationDeleted):
         association = event.property
         if type(association) is not association_property:
             return
-        element_id = event.element.id
-        value_id = event.old_value.id
-
-        def c_undo_association_delete_event():
-            element = self.deep_lookup(element_id)
-            value = self.deep_lookup(value_id)
-            association._set(element, value, from_opposite=True)
-
-        c_undo_association_delete_event.__doc__ = (
-            f"{event.element}.{association.name} add {event.old_value}."
+        self._add_undo_record(
+            REVERT_ASSOCIATION_DELETED,
+            (
+                self._set_association,
+                self._ref(event.element),
+                association,
+                self._ref(event.old_value),
+            ),
         )
-        del event
 
-        self.add_undo_action(c_undo_association_delete_event)
+    def _set_association(self, element_id, association, value_id):
+        element = self.deep_lookup(element_id)
+        value = value_id and self.deep_lookup(value_id)
+        association._set(element, value, from_opposite=True)
+
+    def _del_association(self, element_id, association, value_id):
+        element = self.deep_lookup(element_id)
+        value = self.deep_lookup(value_id)
+        association._del(element, value, from_opposite=True)
@@ -0,0 +1,409 @@
+"""Compact binary model format.
+
+A compact model file holds the same information as an XML model file,
+as a stream of length-prefixed records:
+
+    MAGIC | flags | records...
+
+If the ``COMPRESSED`` flag is set, the records are zlib compressed.
+All numbers are unsigned LEB128 varints. Each record starts with an
+opcode:
+
+    STRING   length, utf-8 data    -- append a string to the string table
+    HEADER   version, gaphor-version
+    ELEMENT  type, id, count, property * count
+
+A property is a kind (``VALUE``, ``REF`` or ``REFLIST``), a name and
+either a string (value, reference) or a count followed by references.
+Types, ids, names and values are all indices in the string table, so
+each string is stored only once.
+
+``CompactWriter`` has the same interface as ``XMLWriter``, so models can
+be saved with ``storage.save(CompactWriter(out), factory)``. The file
+format is detected when a model is loaded.
+"""
+
+from __future__ import annotations
+
+import zlib
+
+from gaphor.storage.parser import (
+    XMLNS,
+    GaphorLoader,
+    ParserException,
+    element,
+    parse_generator,
+)
+
+__all__ = ["CompactWriter", "CompactParser", "convert"]
+
+MAGIC = b"\x89GAPHOR\n"
+COMPRESSED = 0x01
+
+STRING, HEADER, ELEMENT = range(3)
+VALUE, REF, REFLIST = range(3)
+
+
+def write_varint(buffer: bytearray, value: int) -> None:
+    while value > 0x7F:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class CompactWriter:
+    """Write a model in the compact format.
+
+    This writer understands the tags written by ``storage.save()``:
+    elements in a root tag, with properties containing a ``<val>``,
+    ``<ref>`` or ``<reflist>``. Models saved before Gaphor 2.5 nest
+    canvas items in their diagram. Those can not be written directly,
+    use ``convert()`` to flatten them first.
+    """
+
+    def __init__(self, out, compress=True, buffer_size=65536):
+        """The ``out`` file should be opened in binary mode."""
+        self._out = out
+        self._compressor = zlib.compressobj(1) if compress else None
+        self._buffer_size = buffer_size
+        self._buffer = bytearray()
+        self._strings: dict[str, int] = {}
+        self._depth = 0
+        self._element: tuple[int, int] = (0, 0)
+        self._properties = bytearray()
+        self._count = 0
+        self._name = 0
+        self._kind: int | None = None
+        self._refs: list[int] = []
+        self._text = ""
+
+    def _index(self, s: str) -> int:
+        try:
+            return self._strings[s]
+        except KeyError:
+            index = self._strings[s] = len(self._strings)
+            data = s.encode("utf-8")
+            self._buffer.append(STRING)
+            write_varint(self._buffer, len(data))
+            self._buffer += data
+            return index
+
+    def _flush(self):
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        if self._compressor:
+            data = self._compressor.compress(data)
+        self._out.write(data)
+
+    def startDocument(self):
+        flags = COMPRESSED if self._compressor else 0
+        self._out.write(MAGIC + bytes((flags,)))
+
+    def endDocument(self):
+        self._flush()
+        if self._compressor:
+            self._out.write(self._compressor.flush())
+
+    def startPrefixMapping(self, prefix, uri):
+        pass
+
+    def endPrefixMapping(self, prefix):
+        pass
+
+    def startElementNS(self, name, qname, attrs):
+        self.startElement(name[1], {key[1]: val for key, val in attrs.items()})
+
+    def endElementNS(self, name, qname):
+        self.endElement(name[1])
+
+    def startElement(self, name, attrs):
+        depth = self._depth = self._depth + 1
+        if depth == 1:
+            version = self._index(attrs["version"])
+            gaphor_version = self._index(attrs.get("gaphor-version", ""))
+            self._buffer.append(HEADER)
+            write_varint(self._buffer, version)
+            write_varint(self._buffer, gaphor_version)
+        elif depth == 2:
+            self._element = (self._index(name), self._index(attrs["id"]))
+            self._properties.clear()
+            self._count = 0
+        elif depth == 3:
+            self._name = self._index(name)
+        elif depth == 4 and name == "val":
+            self._kind = VALUE
+            self._text = ""
+        elif depth == 4 and name == "ref":
+            self._kind = REF
+            self._refs = [self._index(attrs["refid"])]
+        elif depth == 4 and name == "reflist":
+            self._kind = REFLIST
+            self._refs = []
+        elif depth == 5 and name == "ref" and self._kind == REFLIST:
+            self._refs.append(self._index(attrs["refid"]))
+        else:
+            raise ValueError(
+                f"Tag <{name}> can not be written in compact format, "
+                "use convert() for models saved before Gaphor 2.5"
+            )
+
+    def endElement(self, name):
+        depth = self._depth
+        self._depth -= 1
+        if depth == 4:
+            self._end_property()
+        elif depth == 2:
+            buffer = self._buffer
+            buffer.append(ELEMENT)
+            write_varint(buffer, self._element[0])
+            write_varint(buffer, self._element[1])
+            write_varint(buffer, self._count)
+            buffer += self._properties
+            if len(buffer) >= self._buffer_size:
+                self._flush()
+
+    def _end_property(self):
+        kind = self._kind
+        properties = self._properties
+        if kind == VALUE:
+            value = self._index(self._text)
+            properties.append(VALUE)
+            write_varint(properties, self._name)
+            write_varint(properties, value)
+        elif kind == REF:
+            properties.append(REF)
+            write_varint(properties, self._name)
+            write_varint(properties, self._refs[0])
+        else:
+            properties.append(REFLIST)
+            write_varint(properties, self._name)
+            write_varint(properties, len(self._refs))
+            for ref in self._refs:
+                write_varint(properties, ref)
+        self._count += 1
+        self._kind = None
+
+    def characters(self, content):
+        if self._kind == VALUE:
+            self._text += content
+
+
+class _Incomplete(Exception):
+    """The buffer ends in the middle of a record."""
+
+
+class CompactParser:
+    """Feed a GaphorLoader from a compact model file.
+
+    Like the XML parsers, data can be fed in chunks of any size. Elements
+    are handed to the loader as soon as their record has been read.
+    """
+
+    file_mode = "rb"
+    block_size = 16384
+
+    def __init__(self, loader: GaphorLoader):
+        self.loader = loader
+        self._buffer = bytearray()
+        self._header = True
+        self._decompressor = None
+        self._strings: list[str] = []
+
+        loader.startDocument()
+
+    def feed(self, data):
+        if self._header:
+            self._buffer += data
+            size = len(MAGIC)
+            if len(self._buffer) <= size:
+                return
+            if not self._buffer.startswith(MAGIC):
+                raise ParserException("Not a compact Gaphor model file")
+            flags = self._buffer[size]
+            start = size + 1
+            data = bytes(self._buffer[start:])
+            self._buffer.clear()
+            self._header = False
+            if flags & COMPRESSED:
+                self._decompressor = zlib.decompressobj()
+
+        if self._decompressor:
+            data = self._decompressor.decompress(data)
+        self._buffer += data
+        self._read_records()
+
+    def close(self):
+        if self._decompressor:
+            self._buffer += self._decompressor.flush()
+            self._read_records()
+            if not self._decompressor.eof:
+                raise ParserException("File corrupt: compressed data is truncated")
+        if self._header or self._buffer:
+            raise ParserException("File corrupt: file is truncated")
+        self.loader.endElement("gaphor")
+        self.loader.endDocument()
+
+    def _read_records(self):
+        buffer = self._buffer
+        strings = self._strings
+        end = len(buffer)
+        pos = 0
+
+        def varint():
+            nonlocal pos
+            shift = value = 0
+            while True:
+                if pos >= end:
+                    raise _Incomplete()
+                b = buffer[pos]
+                pos += 1
+                value |= (b & 0x7F) << shift
+                if b < 0x80:
+                    return value
+                shift += 7
+
+        try:
+            while pos < end:
+                start = pos
+                opcode = buffer[pos]
+                pos += 1
+                if opcode == STRING:
+                    length = varint()
+                    stop = pos + length
+                    if stop > end:
+                        raise _Incomplete()
+                    strings.append(buffer[pos:stop].decode("utf-8"))
+                    pos = stop
+                elif opcode == ELEMENT:
+                    self._element(varint, strings)
+                elif opcode == HEADER:
+                    version = strings[varint()]
+                    gaphor_version = strings[varint()]
+                    self.loader.startElement(
+                        "gaphor", {"version": version, "gaphor-version": gaphor_version}
+                    )
+                else:
+                    raise ParserException(f"File corrupt: unknown record {opcode}")
+        except _Incomplete:
+            pos = start
+        except IndexError as e:
+            raise ParserException("File corrupt: undefined string") from e
+        del buffer[:pos]
+
+    def _element(self, varint, strings):
+        type = strings[varint()]
+        id = strings[varint()]
+        values = {}
+        references: dict[str, str | list[str]] = {}
+        for _ in range(varint()):
+            kind = varint()
+            name = strings[varint()]
+            if kind == VALUE:
+                values[name] = strings[varint()]
+            elif kind == REF:
+                references[name] = strings[varint()]
+            elif kind == REFLIST:
+                references[name] = [strings[varint()] for _ in range(varint())]
+            else:
+                raise ParserException(f"File corrupt: unknown property kind {kind}")
+
+        # Only hand out complete elements
+        elem = element(id, type)
+        elem.values = values
+        elem.references = references
+        loader = self.loader
+        if id in loader.elements:
+            raise ParserException(f"File corrupt: duplicate element {id}")
+        loader.elements[id] = elem
+        loader.element_parsed(elem)
+
+
+def write_elements(writer, elements, version, gaphor_version):
+    """Write parsed elements (see ``parser.parse()``) with a writer.
+
+    The writer can be an ``XMLWriter`` or a ``CompactWriter``.
+    """
+    writer.startDocument()
+    writer.startPrefixMapping("", XMLNS)
+    attrs = {(XMLNS, "version"): version}
+    if gaphor_version:
+        attrs[(XMLNS, "gaphor-version")] = gaphor_version
+    writer.startElementNS((XMLNS, "gaphor"), None, attrs)
+    for elem in elements.values():
+        writer.startElement(elem.type, {"id": elem.id})
+        for name, value in elem.values.items():
+            writer.startElement(name, {})
+            writer.startElement("val", {})
+            writer.characters(value)
+            writer.endElement("val")
+            writer.endElement(name)
+        for name, refids in elem.references.items():
+            writer.startElement(name, {})
+            if isinstance(refids, list):
+                writer.startElement("reflist", {})
+                for refid in refids:
+                    writer.startElement("ref", {"refid": refid})
+                    writer.endElement("ref")
+                writer.endElement("reflist")
+            else:
+                writer.startElement("ref", {"refid": refids})
+                writer.endElement("ref")
+            writer.endElement(name)
+        writer.endElement(elem.type)
+    writer.endElementNS((XMLNS, "gaphor"), None)
+    writer.endPrefixMapping("")
+    writer.endDocument()
+
+
+def convert(source, target, compact=True, compress=True):
+    """Convert a model file to the compact format, or back to XML.
+
+    The format of the source file is detected. Canvas items nested in a
+    diagram (models saved before Gaphor 2.5) are flattened by the parser,
+    the same way they are when the model is loaded. Other upgrades are
+    left to the loader: the Gaphor version of the source file is kept.
+    """
+    from gaphor.storage.xmlwriter import XMLWriter
+
+    loader = GaphorLoader()
+    for _ in parse_generator(source, loader):
+        pass
+
+    if compact:
+        with open(target, "wb") as out:
+            writer = CompactWriter(out, compress=compress)
+            write_elements(
+                writer, loader.elements, loader.version, loader.gaphor_version
+            )
+    else:
+        with open(target, "w", encoding="utf-8") as out:
+            writer = XMLWriter(out, encoding="utf-8")
+            write_elements(
+                writer, loader.elements, loader.version, loader.gaphor_version
+            )
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Convert Gaphor models between the XML and the compact format."
+    )
+    parser.add_argument("source", help="model file, in any format")
+    parser.add_argument("target", help="file to write the converted model to")
+    parser.add_argument(
+        "--xml", action="store_true", help="write XML instead of the compact format"
+    )
+    parser.add_argument(
+        "--no-compress",
+        dest="compress",
+        action="store_false",
+        help="do not compress the compact format",
+    )
+    args = parser.parse_args(argv)
+    convert(args.source, args.target, compact=not args.xml, compress=args.compress)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
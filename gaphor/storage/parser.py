@@ -24,8 +24,10 @@ from __future__ import annotations
 import io
 import logging
 import os
+import sys
 from collections import OrderedDict
 from typing import IO
+from xml.parsers import expat
 from xml.sax import handler
 
 from gaphor.storage.upgrade_canvasitem import upgrade_canvasitem
@@ -261,20 +263,35 @@ class GaphorLoader(handler.ContentHandler):
         raise ParserException(f"Invalid XML: tag <{name}> not known (state = {state})")
 
     def endElement(self, name):
+        state = self.state()
         # Put the text on the value
-        if self.state() == VAL:
+        if state == VAL:
             # Two levels up: the attribute name
             n = self.peek(2)
             # Three levels up: the element instance
             self.peek(3).values[n] = self.text
-        elif self.state() == ITEM:
+        elif state == ITEM:
             item = self.pop()
             new_canvasitems = upgrade_canvasitem(item, self.gaphor_version)
             for new_item in new_canvasitems:
                 self.elements[new_item.id] = new_item
+            self.element_parsed(item)
+            for new_item in new_canvasitems:
+                self.element_parsed(new_item)
+            return
+        elif state in (ELEMENT, DIAGRAM):
+            self.element_parsed(self.pop())
             return
         self.pop()
 
+    def element_parsed(self, elem: element) -> None:
+        """Called when an element, including all its values and references,
+        has been read.
+
+        By default, nothing is done: all elements are collected in
+        ``elements``.
+        """
+
     def startElementNS(self, name, qname, attrs):
         if not name[0] or name[0] == XMLNS:
             a = {key[1]: val for key, val in list(attrs.items())}
@@ -289,29 +306,123 @@ class GaphorLoader(handler.ContentHandler):
         self.text = self.text + content
 
 
-def parse(filename) -> dict[str, element]:
+def parse(filename, backend: str | None = None) -> dict[str, element]:
     """Parse a file and return a dictionary ID:element."""
     loader = GaphorLoader()
 
-    for _ in parse_generator(filename, loader):
+    for _ in parse_generator(filename, loader, backend):
         pass
     return loader.elements
 
 
-def parse_generator(filename, loader):
+def parse_generator(filename, loader, backend: str | None = None):
     """The generator based version of parse().
 
     parses the file filename and load it with ContentHandler loader.
+
+    The parser backend is either ``"expat"``, ``"sax"`` or ``"compact"``.
+    By default the backend is detected from the file contents: the
+    compact format is read by the compact backend, XML files by
+    ``DEFAULT_BACKEND``.
     """
     assert isinstance(loader, GaphorLoader), "loader should be a GaphorLoader"
+
+    parser = BACKENDS[backend or detect_backend(filename)](loader)
+
+    yield from parse_file(filename, parser)
+
+
+def make_sax_parser(loader: GaphorLoader):
+    """Create a SAX parser that feeds ``loader``."""
     from xml.sax import make_parser
 
     parser = make_parser()
 
     parser.setFeature(handler.feature_namespaces, 1)
     parser.setContentHandler(loader)
+    return parser
+
+
+def make_compact_parser(loader: GaphorLoader):
+    """Create a parser for the compact model format."""
+    from gaphor.storage.compact import CompactParser
+
+    return CompactParser(loader)
+
+
+def detect_backend(filename) -> str:
+    """Find the parser backend for a file (name or file object)."""
+    from gaphor.storage.compact import MAGIC
+
+    if isinstance(filename, io.TextIOBase):
+        return DEFAULT_BACKEND
+    elif isinstance(filename, io.IOBase):
+        pos = filename.tell()
+        magic = filename.read(len(MAGIC))
+        filename.seek(pos)
+    else:
+        with open(filename, "rb") as f:
+            magic = f.read(len(MAGIC))
+    return "compact" if magic == MAGIC else DEFAULT_BACKEND
 
-    yield from parse_file(filename, parser)
+
+class ExpatParser:
+    """Feed a GaphorLoader straight from expat callbacks.
+
+    This bypasses the SAX layer: no namespace tuples and attribute
+    objects are created for each tag. Tag names are mapped to (interned)
+    local names once.
+    """
+
+    def __init__(self, loader: GaphorLoader):
+        self.loader = loader
+        self._local_names: dict[str, str | None] = {}
+
+        parser = expat.ParserCreate(namespace_separator=" ")
+        parser.buffer_text = True
+        parser.StartElementHandler = self.start_element
+        parser.EndElementHandler = self.end_element
+        parser.CharacterDataHandler = loader.characters
+        self._parser = parser
+
+        loader.startDocument()
+
+    def local_name(self, name: str) -> str | None:
+        """The local name of a tag in the Gaphor namespace, or None."""
+        try:
+            return self._local_names[name]
+        except KeyError:
+            namespace, _, local = name.rpartition(" ")
+            local_name = self._local_names[name] = (
+                sys.intern(local) if not namespace or namespace == XMLNS else None
+            )
+            return local_name
+
+    def start_element(self, name, attrs):
+        local_name = self.local_name(name)
+        if local_name:
+            self.loader.startElement(local_name, attrs)
+
+    def end_element(self, name):
+        local_name = self.local_name(name)
+        if local_name:
+            self.loader.endElement(local_name)
+
+    def feed(self, data):
+        self._parser.Parse(data, False)
+
+    def close(self):
+        self._parser.Parse("", True)
+        self.loader.endDocument()
+
+
+BACKENDS = {
+    "expat": ExpatParser,
+    "sax": make_sax_parser,
+    "compact": make_compact_parser,
+}
+
+DEFAULT_BACKEND = "expat"
 
 
 class ProgressGenerator:
@@ -374,12 +485,13 @@ def parse_file(filename, parser):
         file_obj: IO | io.IOBase = filename
     else:
         is_fd = False
-        file_obj = open(filename, "r")
+        file_obj = open(filename, getattr(parser, "file_mode", "r"))
 
     try:
-        yield from ProgressGenerator(file_obj, parser)
-    finally:
+        yield from ProgressGenerator(
+            file_obj, parser, getattr(parser, "block_size", 512)
+        )
         parser.close()
-
+    finally:
         if not is_fd:
             file_obj.close()
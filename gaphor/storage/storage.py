@@ -7,6 +7,7 @@ file save(filename)     store the current model in a file
 __all__ = ["load", "save"]
 
 import io
+import itertools
 import logging
 import os.path
 from functools import partial
@@ -32,7 +33,8 @@ def save(writer=None, factory=None, status_queue=None):
 
 def save_generator(writer, factory):
     """Save the current model using @writer, which is a
-    gaphor.storage.xmlwriter.XMLWriter instance."""
+    gaphor.storage.xmlwriter.XMLWriter or a
+    gaphor.storage.compact.CompactWriter instance."""
 
     writer.startDocument()
     writer.startPrefixMapping("", NAMESPACE_MODEL)
@@ -181,17 +183,7 @@ def _load_elements_and_canvasitems(
     def create_element(elem):
         if elem.element:
             return
-        if version_lower_than(gaphor_version, (2, 1, 0)):
-            elem = upgrade_element_owned_comment_to_comment(elem)
-        if version_lower_than(gaphor_version, (2, 3, 0)):
-            elem = upgrade_package_owned_classifier_to_owned_type(elem)
-            elem = upgrade_implementation_to_interface_realization(elem)
-            elem = upgrade_feature_parameters_to_owned_parameter(elem)
-            elem = upgrade_parameter_owner_formal_param(elem)
-        if version_lower_than(gaphor_version, (2, 5, 0)):
-            elem = upgrade_diagram_element(elem)
-        if version_lower_than(gaphor_version, (2, 6, 0)):
-            elem = upgrade_generalization_arrow_direction(elem)
+        elem = upgrade_element(elem, gaphor_version)
 
         cls = modeling_language.lookup_element(elem.type)
         assert cls, f"Type {elem.type} can not be loaded: no such element"
@@ -208,6 +200,23 @@ def _load_elements_and_canvasitems(
         create_element(elem)
 
 
+def upgrade_element(elem, gaphor_version):
+    """Apply all upgrades required for an element from a model saved with
+    ``gaphor_version``."""
+    if version_lower_than(gaphor_version, (2, 1, 0)):
+        elem = upgrade_element_owned_comment_to_comment(elem)
+    if version_lower_than(gaphor_version, (2, 3, 0)):
+        elem = upgrade_package_owned_classifier_to_owned_type(elem)
+        elem = upgrade_implementation_to_interface_realization(elem)
+        elem = upgrade_feature_parameters_to_owned_parameter(elem)
+        elem = upgrade_parameter_owner_formal_param(elem)
+    if version_lower_than(gaphor_version, (2, 5, 0)):
+        elem = upgrade_diagram_element(elem)
+    if version_lower_than(gaphor_version, (2, 6, 0)):
+        elem = upgrade_generalization_arrow_direction(elem)
+    return elem
+
+
 def _load_attributes_and_references(elements, update_status_queue):
     for id, elem in list(elements.items()):
         yield from update_status_queue()
@@ -238,18 +247,151 @@ def _load_attributes_and_references(elements, update_status_queue):
                     elem.element.load(name, ref.element)
 
 
-def load(filename, factory, modeling_language, status_queue=None):
+class PendingReference:
+    """A reference (or list of references) that can not be loaded yet,
+    because not all referenced elements have been created."""
+
+    __slots__ = ("element", "name", "refids", "missing")
+
+    def __init__(self, element, name, refids, missing):
+        self.element = element
+        self.name = name
+        self.refids = refids
+        self.missing = missing
+
+
+class ModelLoader(parser.GaphorLoader):
+    """Create model elements while the file is being parsed.
+
+    Each element is created as soon as it has been read completely.
+    References to elements that have not been created yet are kept in a
+    table of pending references and are loaded once the referenced elements
+    are created. Lists of references are only loaded once all referenced
+    elements exist, so their order is retained.
+
+    Parsed elements are discarded once created, so they do not take up
+    memory for the rest of the load.
+    """
+
+    def __init__(self, factory, modeling_language):
+        self.factory = factory
+        self.modeling_language = modeling_language
+        super().__init__()
+
+    def startDocument(self):
+        super().startDocument()
+        self._pending_references: dict[str, list[PendingReference]] = {}
+        # Presentation elements waiting for their diagram
+        self._pending_presentations: dict[str, list[parser.element]] = {}
+        # Position in the file of pending presentation elements
+        self._positions: dict[str, int] = {}
+        self._position = itertools.count()
+
+    def endDocument(self):
+        super().endDocument()
+        if self._pending_references or self._pending_presentations:
+            missing = sorted(
+                set(self._pending_references) | set(self._pending_presentations)
+            )
+            raise parser.ParserException(
+                f"File corrupt: elements {', '.join(missing)} are referenced, but not defined"
+            )
+
+    def start_root(self, state, name, attrs):
+        if super().start_root(state, name, attrs):
+            if version_lower_than(self.gaphor_version, (0, 17, 0)):
+                raise ValueError(
+                    f"Gaphor model version should be at least 0.17.0 (found {self.gaphor_version})"
+                )
+            return True
+
+    def start_canvas_item(self, state, name, attrs):
+        if super().start_canvas_item(state, name, attrs):
+            # Nested items (Gaphor < 2.5) are parsed before their parent:
+            # remember where the item starts in the file.
+            self._positions[attrs["id"]] = next(self._position)
+            return True
+
+    def element_parsed(self, elem):
+        self._create_element(upgrade_element(elem, self.gaphor_version))
+
+    def _create_element(self, elem):
+        cls = self.modeling_language.lookup_element(elem.type)
+        assert cls, f"Type {elem.type} can not be loaded: no such element"
+        if issubclass(cls, Presentation):
+            diagram_id = elem.references["diagram"]
+            diagram = self.factory.lookup(diagram_id)
+            if not diagram:
+                self._positions.setdefault(elem.id, next(self._position))
+                self._pending_presentations.setdefault(diagram_id, []).append(elem)
+                self.elements.pop(elem.id, None)
+                return
+            element = self.factory.create_as(cls, elem.id, diagram)
+            self._positions.pop(elem.id, None)
+        else:
+            element = self.factory.create_as(cls, elem.id)
+
+        self.elements.pop(elem.id, None)
+        self._load_element(element, elem)
+
+    def _load_element(self, element, elem):
+        for name, value in elem.values.items():
+            element.load(name, value)
+
+        for name, refids in elem.references.items():
+            self._load_reference(element, name, refids)
+
+        for pending in self._pending_references.pop(element.id, ()):
+            pending.missing -= 1
+            if not pending.missing:
+                self._load_reference(pending.element, pending.name, pending.refids)
+
+        pending = self._pending_presentations.pop(element.id, None)
+        if pending:
+            # Create presentation elements in the order they appear in the file
+            positions = self._positions
+            for item in sorted(pending, key=lambda item: positions.pop(item.id)):
+                self._create_element(item)
+
+    def _load_reference(self, element, name, refids):
+        lookup = self.factory.lookup
+        if isinstance(refids, list):
+            missing = {refid for refid in refids if lookup(refid) is None}
+            if not missing:
+                for refid in refids:
+                    element.load(name, lookup(refid))
+                return
+        else:
+            ref = lookup(refids)
+            if ref is not None:
+                element.load(name, ref)
+                return
+            missing = {refids}
+
+        pending = PendingReference(element, name, refids, len(missing))
+        for refid in missing:
+            self._pending_references.setdefault(refid, []).append(pending)
+
+
+def load(filename, factory, modeling_language, status_queue=None, streaming=False):
     """Load a file and create a model if possible.
 
     Optionally, a status queue function can be given, to which the
     progress is written (as status_queue(progress)).
+
+    If ``streaming`` is set, model elements are created while the file is
+    parsed (see ``ModelLoader``). The current model is then replaced
+    before the file is known to be valid: a parse error leaves a
+    partially loaded model.
     """
-    for status in load_generator(filename, factory, modeling_language):
+    for status in load_generator(
+        filename, factory, modeling_language, streaming=streaming
+    ):
         if status_queue:
             status_queue(status)
 
 
-def load_generator(filename, factory, modeling_language):
+def load_generator(filename, factory, modeling_language, streaming=False):
     """Load a file and create a model if possible.
 
     This function is a generator. It will yield values from 0 to 100 (%)
@@ -259,6 +401,11 @@ def load_generator(filename, factory, modeling_language):
         log.info("Loading file from file descriptor")
     else:
         log.info(f"Loading file {os.fsdecode(os.path.basename(filename))}")
+
+    if streaming:
+        yield from _streaming_load_generator(filename, factory, modeling_language)
+        return
+
     try:
         # Use the incremental parser and yield the percentage of the file.
         loader = parser.GaphorLoader()
@@ -288,14 +435,50 @@ def load_generator(filename, factory, modeling_language):
                 elements, factory, modeling_language, gaphor_version
             ):
                 if percentage:
-                    yield percentage / 2 + 50
+                    yield percentage * 0.4 + 50
                 else:
                     yield percentage
-            yield 100
         except Exception as e:
             log.warning(f"file {filename} could not be loaded ({e})")
             raise
-    factory.model_ready()
+    for percentage in factory.model_ready_generator():
+        yield percentage / 10 + 90
+
+
+def _streaming_load_generator(filename, factory, modeling_language):
+    # Fail on unreadable files before the current model is flushed
+    try:
+        backend = parser.detect_backend(filename)
+    except OSError:
+        log.exception("File could no be parsed")
+        raise
+
+    factory.flush()
+    with factory.block_events():
+        try:
+            loader = ModelLoader(factory, modeling_language)
+            for percentage in parser.parse_generator(filename, loader, backend):
+                if percentage:
+                    yield percentage * 0.8
+                else:
+                    yield percentage
+
+            upgrade_ensure_style_sheet_is_present(factory)
+
+            elements = factory.lselect()
+            size = len(elements)
+            for n, element in enumerate(elements, start=1):
+                element.postload()
+                if n % 30 == 0:
+                    yield 80 + (n * 10) / size
+        except OSError:
+            log.exception("File could no be parsed")
+            raise
+        except Exception as e:
+            log.warning(f"file {filename} could not be loaded ({e})")
+            raise
+    for percentage in factory.model_ready_generator():
+        yield percentage / 10 + 90
 
 
 def version_lower_than(gaphor_version, version):
@@ -311,7 +494,7 @@ def version_lower_than(gaphor_version, version):
 
 # since 2.2.0
 def upgrade_ensure_style_sheet_is_present(factory):
-    style_sheet = next(factory.select(StyleSheet), None)
+    style_sheet = factory.lookup_singleton(StyleSheet)
     if not style_sheet:
         factory.create(StyleSheet)
 
@@ -0,0 +1,135 @@
+import io
+
+import pytest
+
+from gaphor.core.modeling import Presentation
+from gaphor.storage import compact, parser, storage
+from gaphor.storage.compact import CompactWriter
+from gaphor.storage.tests.test_parser import parsed, scaled_model
+from gaphor.storage.tests.test_storage import saved_elements
+from gaphor.storage.xmlwriter import XMLWriter
+
+MODELS = [
+    "all-elements.gaphor",
+    "all-elements-v2.5.gaphor",
+    "node-component-v2.1.gaphor",
+    "simple-items.gaphor",
+    "test-model.gaphor",
+]
+
+
+def compact_data(element_factory, compress=True):
+    f = io.BytesIO()
+    storage.save(CompactWriter(f, compress=compress), factory=element_factory)
+    return f.getvalue()
+
+
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("compress", [True, False])
+@pytest.mark.parametrize("streaming", [True, False])
+def test_compact_format_round_trip(
+    element_factory, modeling_language, test_models, model, compress, streaming
+):
+    storage.load(test_models / model, element_factory, modeling_language)
+    expected = saved_elements(element_factory)
+
+    data = compact_data(element_factory, compress)
+    storage.load(
+        io.BytesIO(data), element_factory, modeling_language, streaming=streaming
+    )
+
+    assert saved_elements(element_factory) == expected
+
+
+def test_compact_format_is_detected(element_factory, tmp_path):
+    path = tmp_path / "model.gaphor"
+    path.write_bytes(compact_data(element_factory))
+
+    assert parser.detect_backend(path) == "compact"
+    assert parser.detect_backend(io.BytesIO(path.read_bytes())) == "compact"
+    assert parser.detect_backend(io.StringIO("<?xml")) == parser.DEFAULT_BACKEND
+
+
+def test_compact_format_is_smaller(element_factory, modeling_language, test_models):
+    path = test_models / "all-elements.gaphor"
+    storage.load(path, element_factory, modeling_language)
+
+    assert len(compact_data(element_factory, compress=False)) < path.stat().st_size
+
+
+@pytest.mark.parametrize("model", MODELS)
+def test_convert_to_compact_and_back(test_models, tmp_path, model):
+    compact.convert(test_models / model, tmp_path / "model.compact")
+    compact.convert(tmp_path / "model.compact", tmp_path / "model.xml", compact=False)
+
+    original = parsed(parser.parse(test_models / model))
+    assert parsed(parser.parse(tmp_path / "model.compact")) == original
+    assert parsed(parser.parse(tmp_path / "model.xml")) == original
+
+
+def test_convert_keeps_gaphor_version(test_models, tmp_path):
+    compact.convert(test_models / "all-elements-v2.5.gaphor", tmp_path / "model")
+
+    loader = parser.GaphorLoader()
+    for _ in parser.parse_generator(tmp_path / "model", loader):
+        pass
+
+    assert loader.gaphor_version == "2.5.0"
+
+
+def test_truncated_compact_file(element_factory, modeling_language, test_models):
+    storage.load(
+        test_models / "simple-items.gaphor", element_factory, modeling_language
+    )
+    data = compact_data(element_factory, compress=False)
+
+    with pytest.raises(parser.ParserException):
+        parser.parse(io.BytesIO(data[:-3]))
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("format", ["xml", "compact"])
+def test_save_and_load_performance(
+    element_factory, modeling_language, test_models, format
+):
+    data = scaled_model(test_models / "all-elements.gaphor", 20)
+    storage.load(io.StringIO(data), element_factory, modeling_language)
+    size = element_factory.size()
+
+    if format == "xml":
+        f = io.StringIO()
+        storage.save(XMLWriter(f), factory=element_factory)
+    else:
+        f = io.BytesIO()
+        storage.save(CompactWriter(f), factory=element_factory)
+    f.seek(0)
+
+    storage.load(f, element_factory, modeling_language)
+
+    assert element_factory.size() == size
+
+
+def test_convert_model_with_nested_canvas_items(
+    element_factory, modeling_language, test_models, tmp_path
+):
+    # Before Gaphor 2.5, canvas items were nested in the diagram
+    path = test_models / "node-component-v2.1.gaphor"
+
+    def model_elements():
+        # Old models get a new style sheet every time they are loaded
+        return {
+            id: elem
+            for id, elem in saved_elements(element_factory).items()
+            if elem[0] != "StyleSheet"
+        }
+
+    storage.load(path, element_factory, modeling_language)
+    expected = model_elements()
+
+    compact.convert(path, tmp_path / "model.compact")
+    storage.load(tmp_path / "model.compact", element_factory, modeling_language)
+
+    assert model_elements() == expected
+    assert any(
+        item.parent for item in element_factory.select(Presentation) if item.diagram
+    )
@@ -1,3 +1,8 @@
+import io
+import re
+
+import pytest
+
 from gaphor.storage.parser import parse
 
 
@@ -12,3 +17,44 @@ def test_parsing_v2_1_model_with_grouped_item(test_models):
     assert component_item.references["diagram"] == diagram.id
     assert "parent" not in node_item.references
     assert node_item.references["diagram"] == diagram.id
+
+
+def parsed(elements):
+    return {id: (e.type, e.values, e.references) for id, e in elements.items()}
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        "all-elements.gaphor",
+        "all-elements-v2.5.gaphor",
+        "node-component-v2.1.gaphor",
+        "test-model.gaphor",
+    ],
+)
+def test_expat_and_sax_backends_parse_the_same(test_models, model):
+    path = test_models / model
+
+    assert parsed(parse(path, backend="expat")) == parsed(parse(path, backend="sax"))
+
+
+def scaled_model(path, times):
+    """Repeat all elements of a model, with unique ids."""
+    text = path.read_text()
+    start = text.index(">", text.index("<gaphor")) + 1
+    end = text.rindex("</gaphor>")
+    copies = (
+        re.sub(r'(ref)?id="([^"]*)"', rf'\1id="\2-{n}"', text[start:end])
+        for n in range(times)
+    )
+    return text[:start] + "".join(copies) + text[end:]
+
+
+@pytest.mark.slow
+@pytest.mark.parametrize("backend", ["sax", "expat"])
+def test_parse_throughput(test_models, backend):
+    data = scaled_model(test_models / "all-elements.gaphor", 100)
+
+    elements = parse(io.StringIO(data), backend=backend)
+
+    assert len(elements) == 100 * len(parse(test_models / "all-elements.gaphor"))
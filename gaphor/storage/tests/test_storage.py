@@ -6,9 +6,9 @@ from io import StringIO
 import pytest
 
 from gaphor import UML
-from gaphor.core.modeling import StyleSheet
+from gaphor.core.modeling import Presentation, StyleSheet
 from gaphor.diagram.general import CommentItem
-from gaphor.storage import storage
+from gaphor.storage import parser, storage
 from gaphor.storage.xmlwriter import XMLWriter
 from gaphor.UML.classes import AssociationItem, ClassItem, InterfaceItem
 
@@ -270,3 +270,151 @@ class TestStorage:
 
         with pytest.raises(ValueError):
             load_old_model()
+
+
+def saved_elements(element_factory):
+    f = StringIO()
+    storage.save(XMLWriter(f), factory=element_factory)
+    return {
+        id: (e.type, e.values, e.references)
+        for id, e in parser.parse(StringIO(f.getvalue())).items()
+    }
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        "all-elements.gaphor",
+        "all-elements-v2.5.gaphor",
+        "node-component-v2.1.gaphor",
+        "simple-items.gaphor",
+        "test-model.gaphor",
+    ],
+)
+def test_streaming_load_matches_regular_load(
+    element_factory, modeling_language, test_models, model
+):
+    path = test_models / model
+
+    def without_style_sheets(elements):
+        # A style sheet is created if the model has none, with a new id
+        return {id: e for id, e in elements.items() if e[0] != "StyleSheet"}
+
+    storage.load(path, element_factory, modeling_language, streaming=False)
+    regular = saved_elements(element_factory)
+
+    storage.load(path, element_factory, modeling_language, streaming=True)
+    streaming = saved_elements(element_factory)
+
+    assert without_style_sheets(streaming) == without_style_sheets(regular)
+
+
+def test_streaming_load_keeps_no_parsed_elements(
+    element_factory, modeling_language, test_models
+):
+    loader = storage.ModelLoader(element_factory, modeling_language)
+    for _ in parser.parse_generator(test_models / "node-component-v2.1.gaphor", loader):
+        pass
+
+    assert element_factory.lselect(Presentation)
+    assert not loader.elements
+    assert not loader._positions
+
+
+def test_streaming_load_of_forward_references(element_factory, modeling_language):
+    data = """<?xml version="1.0" encoding="utf-8"?>
+<gaphor xmlns="http://gaphor.sourceforge.net/model" version="3.0" gaphor-version="2.6.0">
+<Package id="p">
+<ownedType>
+<reflist>
+<ref refid="c1"/>
+<ref refid="c2"/>
+</reflist>
+</ownedType>
+</Package>
+<Class id="c2">
+<name>
+<val>two</val>
+</name>
+</Class>
+<Class id="c1">
+<name>
+<val>one</val>
+</name>
+</Class>
+</gaphor>"""
+
+    storage.load(StringIO(data), element_factory, modeling_language, streaming=True)
+
+    package = element_factory.lookup("p")
+    assert [c.name for c in package.ownedType] == ["one", "two"]
+    assert element_factory.lookup("c1").package is package
+
+
+def test_streaming_load_of_dangling_reference(element_factory, modeling_language):
+    data = """<?xml version="1.0" encoding="utf-8"?>
+<gaphor xmlns="http://gaphor.sourceforge.net/model" version="3.0" gaphor-version="2.6.0">
+<Class id="c1">
+<package>
+<ref refid="p"/>
+</package>
+</Class>
+</gaphor>"""
+
+    with pytest.raises(parser.ParserException):
+        storage.load(StringIO(data), element_factory, modeling_language, streaming=True)
+
+
+def test_streaming_load_can_not_load_models_older_that_0_17_0(
+    element_factory, modeling_language, test_models
+):
+    path = test_models / "old-gaphor-version.gaphor"
+
+    with pytest.raises(ValueError):
+        storage.load(path, element_factory, modeling_language, streaming=True)
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_load_of_missing_file_keeps_current_model(
+    element_factory, modeling_language, tmp_path, streaming
+):
+    klass = element_factory.create(UML.Class)
+
+    with pytest.raises(OSError):
+        storage.load(
+            tmp_path / "missing.gaphor",
+            element_factory,
+            modeling_language,
+            streaming=streaming,
+        )
+
+    assert element_factory.lselect() == [klass]
+
+
+@pytest.mark.parametrize("streaming", [False, True])
+def test_load_generator_reports_progress(
+    element_factory, modeling_language, test_models, streaming
+):
+    path = test_models / "all-elements.gaphor"
+
+    status = list(
+        storage.load_generator(
+            path, element_factory, modeling_language, streaming=streaming
+        )
+    )
+
+    assert status == sorted(status)
+    assert status[-1] == 100
+
+
+@pytest.mark.slow
+def test_save_and_flush_performance(element_factory, modeling_language, models):
+    storage.load(models / "UML.gaphor", element_factory, modeling_language)
+    size = element_factory.size()
+
+    out = StringIO()
+    storage.save(XMLWriter(out), element_factory)
+    element_factory.flush()
+
+    assert len(parser.parse(StringIO(out.getvalue()))) == size
+    assert element_factory.size() == 0
@@ -285,9 +285,9 @@ class DiagramPage:
 
         view = self.view
 
-        item_painter = ItemPainter(view.selection)
-
         sloppiness = style.get("line-style", 0.0)
+        item_painter = ItemPainter(view.selection, cache=not sloppiness)
+
         if sloppiness:
             item_painter = FreeHandPainter(item_painter, sloppiness=sloppiness)
 
@@ -274,7 +274,7 @@ class SettingsStack:
 
     @property
     def style_sheet(self):
-        return next(self.element_factory.select(StyleSheet), None)
+        return self.element_factory.lookup_singleton(StyleSheet)
 
     def on_style_sheet_changed(self, buffer):
         style_sheet = self.style_sheet
@@ -1,6 +1,11 @@
 import pytest
 
+from gaphor import UML
+from gaphor.core.modeling import StyleSheet
 from gaphor.plugins.diagramexport import gaphorconvert
+from gaphor.plugins.diagramexport.tests.test_diagramexport import pdf_pages
+from gaphor.storage import storage
+from gaphor.UML.classes import ClassItem, PackageItem
 
 
 def test_help_output(capsys):
@@ -14,6 +19,8 @@ def test_help_output(capsys):
     assert "--dir=directory" in captured.out
     assert "--format=format" in captured.out
     assert "--regex=regex" in captured.out
+    assert "--jobs=N" in captured.out
+    assert "--single-pdf" in captured.out
 
 
 def test_export_pdf(tmp_path):
@@ -45,3 +52,203 @@ def test_export_svg(tmp_path):
 
     assert model_path.exists()
     assert (model_path / "main.svg").exists()
+
+
+def test_export_single_pdf(tmp_path):
+    status = gaphorconvert.main(
+        ["--single-pdf", "-d", str(tmp_path), "test-models/all-elements.gaphor"]
+    )
+
+    diagrams = list(gaphorconvert.parsed_diagrams("test-models/all-elements.gaphor"))
+    count, _ = pdf_pages(tmp_path / "all-elements.pdf")
+
+    assert status == 0
+    assert count == len(diagrams)
+    assert not (tmp_path / "New model").exists()
+
+
+@pytest.mark.parametrize(
+    "option", [["-f", "png"], ["-f", "svg"], ["-j", "2"], ["--incremental"]]
+)
+def test_single_pdf_can_not_be_combined_with(option, capsys):
+    with pytest.raises(SystemExit, match="2"):
+        gaphorconvert.main(["--single-pdf", *option, "test-models/all-elements.gaphor"])
+
+    captured = capsys.readouterr()
+    assert "--single-pdf" in captured.err
+
+
+def test_export_parallel(tmp_path):
+    status = gaphorconvert.main(
+        ["-j", "2", "-d", str(tmp_path), "test-models/all-elements.gaphor"]
+    )
+
+    model_path = tmp_path / "New model"
+
+    assert status == 0
+    assert (model_path / "main.pdf").exists()
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_export_of_missing_model_fails(tmp_path, capsys, jobs):
+    status = gaphorconvert.main(
+        [
+            "-j",
+            jobs,
+            "-d",
+            str(tmp_path),
+            "test-models/no-such-model.gaphor",
+            "test-models/all-elements.gaphor",
+        ]
+    )
+
+    captured = capsys.readouterr()
+    assert status == 1
+    assert "failed to load test-models/no-such-model.gaphor" in captured.err
+    assert (tmp_path / "New model" / "main.pdf").exists()
+
+
+def test_export_of_failing_diagram_fails(tmp_path, capsys, monkeypatch):
+    def render(diagram_export, diagram, outfilename, format):
+        raise RuntimeError("no luck")
+
+    monkeypatch.setattr(gaphorconvert, "render", render)
+    status = gaphorconvert.main(
+        ["-d", str(tmp_path), "test-models/all-elements.gaphor"]
+    )
+
+    captured = capsys.readouterr()
+    assert status == 1
+    assert "main.pdf: no luck" in captured.err
+
+
+@pytest.mark.parametrize(
+    "model",
+    [
+        "test-models/all-elements.gaphor",
+        "test-models/node-component-v2.1.gaphor",
+        "test-models/test-model.gaphor",
+    ],
+)
+def test_parsed_diagrams_match_loaded_diagrams(case, model):
+    storage.load(model, case.element_factory, case.modeling_language)
+
+    loaded = [
+        (diagram.id, odir, name)
+        for diagram, odir, name in gaphorconvert.loaded_diagrams(case.element_factory)
+    ]
+
+    assert loaded
+    assert list(gaphorconvert.parsed_diagrams(model)) == loaded
+
+
+def test_export_incremental(tmp_path, capsys):
+    args = [
+        "-v",
+        "--incremental",
+        "-d",
+        str(tmp_path),
+        "test-models/all-elements.gaphor",
+    ]
+
+    gaphorconvert.main(args)
+    capsys.readouterr()
+    gaphorconvert.main(args)
+    captured = capsys.readouterr()
+
+    assert (tmp_path / gaphorconvert.Manifest.filename).exists()
+    assert "unchanged: New model/main" in captured.err
+    assert "rendering:" not in captured.err
+
+
+def test_export_incremental_renders_missing_output(tmp_path, capsys):
+    args = [
+        "-v",
+        "--incremental",
+        "-d",
+        str(tmp_path),
+        "test-models/all-elements.gaphor",
+    ]
+
+    gaphorconvert.main(args)
+    (tmp_path / "New model" / "main.pdf").unlink()
+    capsys.readouterr()
+    gaphorconvert.main(args)
+    captured = capsys.readouterr()
+
+    assert "rendering: New model/main" in captured.err
+    assert (tmp_path / "New model" / "main.pdf").exists()
+
+
+def test_diagram_digest_changes_with_rendered_elements(case):
+    style_sheet = case.element_factory.create(StyleSheet)
+    class_item = case.create(ClassItem, UML.Class)
+    attribute = case.element_factory.create(UML.Property)
+    class_item.subject.ownedAttribute = attribute
+
+    digest = gaphorconvert.diagram_digest(case.diagram)
+    assert gaphorconvert.diagram_digest(case.diagram) == digest
+
+    attribute.name = "attr"
+    attribute_digest = gaphorconvert.diagram_digest(case.diagram)
+    assert attribute_digest != digest
+
+    style_sheet.styleSheet = "* { color: red }"
+    assert gaphorconvert.diagram_digest(case.diagram) != attribute_digest
+
+
+def test_diagram_digest_changes_with_operation_parameters(case):
+    class_item = case.create(ClassItem, UML.Class)
+    operation = case.element_factory.create(UML.Operation)
+    parameter = case.element_factory.create(UML.Parameter)
+    operation.ownedParameter = parameter
+    class_item.subject.ownedOperation = operation
+
+    digest = gaphorconvert.diagram_digest(case.diagram)
+    parameter.name = "param"
+
+    assert gaphorconvert.diagram_digest(case.diagram) != digest
+
+
+def test_diagram_digest_ignores_package_contents(case):
+    package_item = case.create(PackageItem, UML.Package)
+    klass = case.element_factory.create(UML.Class)
+    klass.package = package_item.subject
+    attribute = case.element_factory.create(UML.Property)
+    klass.ownedAttribute = attribute
+
+    digest = gaphorconvert.diagram_digest(case.diagram)
+    attribute.name = "attr"
+
+    assert gaphorconvert.diagram_digest(case.diagram) == digest
+    assert list(gaphorconvert.rendered_elements(case.diagram)) == [package_item.subject]
+
+
+def test_diagram_digest_ignores_other_diagrams(case):
+    digest = gaphorconvert.diagram_digest(case.diagram)
+
+    other = case.element_factory.create(UML.Diagram)
+    other.create(ClassItem, subject=case.element_factory.create(UML.Class))
+
+    assert gaphorconvert.diagram_digest(case.diagram) == digest
+
+
+def test_export_parallel_incremental(tmp_path, capsys):
+    args = [
+        "-v",
+        "-j",
+        "2",
+        "--incremental",
+        "-d",
+        str(tmp_path),
+        "test-models/all-elements.gaphor",
+    ]
+
+    gaphorconvert.main(args)
+    capsys.readouterr()
+    status = gaphorconvert.main(args)
+    captured = capsys.readouterr()
+
+    assert status == 0
+    assert "unchanged: New model/main" in captured.err
+    assert "rendered:" not in captured.err